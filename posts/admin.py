@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Post, Group
+from . import search
+from .models import Post, Group, Task
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -8,6 +9,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # вместо LIKE '%q%' по всей таблице ищем по индексу posts.search
+        if not search_term:
+            return queryset, False
+        found = search.search(search_term).values("pk")
+        return queryset.filter(pk__in=found), False
+
 
 admin.site.register(Post, PostAdmin)
 
@@ -20,3 +28,14 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Group, GroupAdmin)
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "status", "attempts", "run_at",
+                    "finished", "worker")
+    list_filter = ("status", "name")
+    readonly_fields = ("created", "started", "finished", "worker", "error")
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(Task, TaskAdmin)
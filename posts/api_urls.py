@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path("posts/", api.posts, name="api_posts"),
+    path("posts/<int:post_id>/", api.post_detail, name="api_post"),
+    path("posts/<int:post_id>/comments/", api.comments,
+         name="api_comments"),
+    path("groups/", api.groups, name="api_groups"),
+    path("follows/", api.follows, name="api_follows"),
+]
@@ -0,0 +1,284 @@
+"""Потоковый экспорт и импорт пользователей, групп, постов, комментариев
+и подписок в JSON Lines или CSV.
+
+Записи читаются и пишутся пакетами: выгрузка идёт по возрастанию pk
+через iterator(), загрузка — через bulk_create по batch_size строк в
+транзакции, поэтому память не зависит от объёма данных. Пользователи
+связываются по username, группы по slug, посты и комментарии сохраняют
+свои id (на них ссылаются адреса страниц). Повторная загрузка тех же
+строк ничего не дублирует, а файл прогресса позволяет продолжить
+прерванный импорт с места остановки.
+"""
+import csv
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ("jsonl", "csv")
+BATCH_SIZE = 5000
+IMAGES_DIR = "images"
+PROGRESS_FILE = ".import-progress.json"
+
+# порядок важен: каждая таблица ссылается только на предыдущие
+FIELDS = {
+    "users": ("id", "username", "first_name", "last_name", "email",
+              "date_joined"),
+    "groups": ("id", "title", "slug", "description"),
+    "posts": ("id", "text", "pub_date", "author__username", "group__slug",
+              "image"),
+    "comments": ("id", "post_id", "author__username", "text", "created",
+                 "parent_id"),
+    "follows": ("id", "user__username", "author__username", "created"),
+}
+MODELS = {"users": User, "groups": Group, "posts": Post,
+          "comments": Comment, "follows": Follow}
+
+
+@contextmanager
+def explicit_dates():
+    """Даёт сохранить pub_date и даты created как есть.
+
+    auto_now_add перезаписывает даты и в bulk_create.
+    """
+    fields = [Post._meta.get_field("pub_date"),
+              Comment._meta.get_field("created"),
+              Follow._meta.get_field("created")]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def data_path(directory, name, fmt):
+    return os.path.join(directory, f"{name}.{fmt}")
+
+
+def _encode(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _last_id(path, fmt):
+    # последний выгруженный pk, чтобы дописать файл после прерывания
+    last = 0
+    for record in read_records(path, fmt):
+        last = int(record["id"])
+    return last
+
+
+def export(name, directory, fmt="jsonl", resume=False, batch_size=BATCH_SIZE,
+           images=False, progress=None):
+    """Выгружает таблицу name в файл; возвращает число записей."""
+    fields = FIELDS[name]
+    path = data_path(directory, name, fmt)
+    after = _last_id(path, fmt) if resume and os.path.exists(path) else 0
+    queryset = MODELS[name].objects.filter(pk__gt=after).order_by(
+        "pk").values_list(*fields)
+    total = 0
+    with open(path, "a" if after else "w", newline="",
+              encoding="utf-8") as file:
+        if fmt == "csv":
+            writer = csv.writer(file)
+            if not after:
+                writer.writerow(fields)
+        for row in queryset.iterator(chunk_size=batch_size):
+            row = [_encode(value) for value in row]
+            if fmt == "csv":
+                writer.writerow(["" if value is None else value
+                                 for value in row])
+            else:
+                file.write(json.dumps(dict(zip(fields, row)),
+                                      ensure_ascii=False) + "\n")
+            if images and name == "posts" and row[-1]:
+                _copy_image_out(row[-1], directory)
+            total += 1
+            if progress and total % batch_size == 0:
+                progress(name, total)
+    if progress:
+        progress(name, total)
+    return total
+
+
+def read_records(path, fmt):
+    with open(path, newline="", encoding="utf-8") as file:
+        if fmt == "csv":
+            # пустая строка в CSV означает NULL
+            for row in csv.DictReader(file):
+                yield {key: value if value != "" else None
+                       for key, value in row.items()}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _copy_image_out(name, directory):
+    target = os.path.join(directory, IMAGES_DIR, name)
+    if os.path.exists(target) or not default_storage.exists(name):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with default_storage.open(name, "rb") as source, \
+            open(target, "wb") as destination:
+        shutil.copyfileobj(source, destination)
+
+
+def _copy_image_in(name, directory):
+    source = os.path.join(directory, IMAGES_DIR, name)
+    if not os.path.exists(source) or default_storage.exists(name):
+        return name
+    with open(source, "rb") as file:
+        return default_storage.save(name, file)
+
+
+def _ids(model, field, values):
+    values = {value for value in values if value is not None}
+    if not values:
+        return {}
+    return dict(model.objects.filter(**{f"{field}__in": values}).values_list(
+        field, "pk"))
+
+
+def _build_users(records, directory, images):
+    # пароли не переносятся: войти можно после сброса пароля
+    password = make_password(None)
+    return [User(username=r["username"], first_name=r["first_name"] or "",
+                 last_name=r["last_name"] or "", email=r["email"] or "",
+                 date_joined=parse_datetime(r["date_joined"]),
+                 password=password) for r in records]
+
+
+def _build_groups(records, directory, images):
+    return [Group(title=r["title"], slug=r["slug"],
+                  description=r["description"] or "") for r in records]
+
+
+def _build_posts(records, directory, images):
+    authors = _ids(User, "username", (r["author__username"] for r in records))
+    groups = _ids(Group, "slug", (r["group__slug"] for r in records))
+    posts = []
+    for r in records:
+        if r["author__username"] not in authors:
+            continue
+        image = r["image"]
+        if image and images:
+            image = _copy_image_in(image, directory)
+        posts.append(Post(
+            id=int(r["id"]), text=r["text"],
+            pub_date=parse_datetime(r["pub_date"]),
+            author_id=authors[r["author__username"]],
+            group_id=groups.get(r["group__slug"]), image=image or None))
+    return posts
+
+
+def _build_comments(records, directory, images):
+    authors = _ids(User, "username", (r["author__username"] for r in records))
+    posts = set(Post.objects.filter(
+        pk__in={int(r["post_id"]) for r in records}).values_list(
+        "pk", flat=True))
+    # parent_id нет в файлах, выгруженных до появления ответов
+    return [Comment(id=int(r["id"]), post_id=int(r["post_id"]),
+                    author_id=authors[r["author__username"]],
+                    text=r["text"], created=parse_datetime(r["created"]),
+                    parent_id=int(r["parent_id"]) if r.get("parent_id")
+                    else None)
+            for r in records
+            if int(r["post_id"]) in posts
+            and r["author__username"] in authors]
+
+
+def _build_follows(records, directory, images):
+    users = _ids(User, "username", (
+        name for r in records
+        for name in (r["user__username"], r["author__username"])))
+    # даты подписки нет в файлах, выгруженных до её появления
+    return [Follow(user_id=users[r["user__username"]],
+                   author_id=users[r["author__username"]],
+                   created=parse_datetime(r["created"]) if r.get("created")
+                   else None)
+            for r in records
+            if r["user__username"] in users
+            and r["author__username"] in users]
+
+
+BUILDERS = {"users": _build_users, "groups": _build_groups,
+            "posts": _build_posts, "comments": _build_comments,
+            "follows": _build_follows}
+
+
+def _load_progress(directory):
+    path = os.path.join(directory, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def _save_progress(directory, done):
+    path = os.path.join(directory, PROGRESS_FILE)
+    with open(path + ".tmp", "w") as file:
+        json.dump(done, file)
+    os.replace(path + ".tmp", path)
+
+
+def reset_progress(directory):
+    path = os.path.join(directory, PROGRESS_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _reset_sequences(model):
+    # после вставки с явными id (PostgreSQL и др.)
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def load(name, directory, fmt="jsonl", batch_size=BATCH_SIZE, images=False,
+         progress=None):
+    """Загружает файл таблицы name; возвращает число прочитанных строк.
+
+    После каждого пакета номер строки сохраняется в файл прогресса,
+    повторный запуск продолжает с неё.
+    """
+    model, build = MODELS[name], BUILDERS[name]
+    done = _load_progress(directory)
+    skip = done.get(name, 0)
+    position = 0
+    batch = []
+
+    def flush():
+        with transaction.atomic():
+            model.objects.bulk_create(
+                build(batch, directory, images), ignore_conflicts=True)
+        done[name] = position
+        _save_progress(directory, done)
+        if progress:
+            progress(name, position)
+
+    with explicit_dates():
+        for record in read_records(data_path(directory, name, fmt), fmt):
+            position += 1
+            if position <= skip:
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+        if batch:
+            flush()
+    if name in ("posts", "comments"):
+        _reset_sequences(model)
+    return position
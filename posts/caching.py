@@ -0,0 +1,119 @@
+"""Кеширование лент и карточек постов с явной инвалидацией.
+
+Каждая лента (главная, группа, автор) и каждый пост имеют номер версии
+в кеше. Ключи списков id на странице и отрендеренных карточек включают
+версию, поэтому изменение данных просто увеличивает версию, а старые
+записи вытесняются сами — без окна устаревания, как у cache_page.
+"""
+import time
+
+from django.core.cache import cache
+
+from yatube.metrics import record_cache
+
+TIMEOUT = 60 * 60
+VERSION_TIMEOUT = None
+
+
+def _version_key(name):
+    return f"v:{name}"
+
+
+def _initial_version():
+    # после вытеснения ключа версия не должна совпасть со старой
+    return int(time.time() * 1000)
+
+
+def versions(names):
+    keys = {_version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    record_cache("version", len(found), len(keys) - len(found))
+    result = {}
+    for key, name in keys.items():
+        if key not in found:
+            cache.add(key, _initial_version(), VERSION_TIMEOUT)
+            found[key] = cache.get(key)
+        result[name] = found[key]
+    return result
+
+
+def version(name):
+    return versions([name])[name]
+
+
+def bump(*names):
+    for name in names:
+        key = _version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), VERSION_TIMEOUT)
+
+
+def index_feed():
+    return "feed:index"
+
+
+def group_feed(group_id):
+    return f"feed:group:{group_id}"
+
+
+def author_feed(author_id):
+    return f"feed:author:{author_id}"
+
+
+def post_name(post_id):
+    return f"post:{post_id}"
+
+
+def group_directory():
+    return "groups"
+
+
+def group_name(group_id):
+    # название и slug группы на карточках её постов
+    return f"group:{group_id}"
+
+
+def author_name(author_id):
+    # имя автора на карточках его постов
+    return f"author:{author_id}"
+
+
+def trending_feed():
+    return "feed:trending"
+
+
+def page_key(feed, token):
+    return f"feed_ids:{feed}:{version(feed)}:{token}"
+
+
+def card_key(post_id, post_version, group_version, author_version,
+             is_author):
+    return (f"post_card:{post_id}:{post_version}:{group_version}:"
+            f"{author_version}:{int(is_author)}")
+
+
+def etag_cards_key(page_hash):
+    return f"etag_cards:{page_hash}"
+
+
+def directory_key(directory_version):
+    return f"group_directory:{directory_version}"
+
+
+def trending_groups_key(trending_version):
+    return f"trending_groups:{trending_version}"
+
+
+def syndication_key(feed, feed_version, fmt):
+    return f"syndication:{feed}:{feed_version}:{fmt}"
+
+
+def invalidate_post(post, old_group_id=None):
+    """Сбрасывает карточку поста и все ленты, в которых он виден."""
+    names = [post_name(post.pk), index_feed(), author_feed(post.author_id)]
+    for group_id in {post.group_id, old_group_id}:
+        if group_id is not None:
+            names.append(group_feed(group_id))
+    bump(*names)
@@ -0,0 +1,116 @@
+"""Постраничные комментарии с деревом ответов.
+
+Дерево хранится материализованным путём: сегмент комментария — время
+создания (до микросекунд) и id, путь ответа — путь родителя, точка и
+свой сегмент. Сортировка по path даёт порядок обсуждения: корневые
+комментарии по (created, id), под каждым — его ответы в том же порядке.
+Поэтому страница — это диапазон path после курсора, а ветка —
+диапазон [path, path + "/"), оба читаются одним запросом по индексу
+(post, path).
+
+Глубина ограничена MAX_DEPTH: ответы глубже встают рядом с родителем.
+"""
+from django.db.models import Value
+from django.db.models.functions import Length, Replace
+from django.utils import timezone
+
+from .models import Comment
+
+PER_PAGE = 20
+MAX_DEPTH = 8
+SEPARATOR = "."
+# следующий после SEPARATOR символ: верхняя граница диапазона ветки
+AFTER_SEPARATOR = "/"
+
+
+def segment(comment):
+    created = comment.created.astimezone(timezone.utc)
+    return f"{created:%Y%m%d%H%M%S%f}{comment.pk:010d}"
+
+
+def make_path(comment, parent_path=None):
+    if not parent_path:
+        return segment(comment)
+    parts = parent_path.split(SEPARATOR)[:MAX_DEPTH - 1]
+    return SEPARATOR.join([*parts, segment(comment)])
+
+
+def find_parent(post, value):
+    """Комментарий того же поста, на который отвечают, или None.
+
+    ``value`` — id из формы или запроса API; чужой или несуществующий
+    комментарий считается ошибкой ValueError.
+    """
+    if value in (None, ""):
+        return None
+    try:
+        return post.comments.only("pk").get(pk=int(value))
+    except (TypeError, ValueError, Comment.DoesNotExist):
+        raise ValueError(value)
+
+
+def assign_path(comment):
+    """Заполняет path только что созданного комментария."""
+    parent_path = None
+    if comment.parent_id:
+        parent_path = Comment.objects.filter(
+            pk=comment.parent_id).values_list("path", flat=True).first()
+    comment.path = make_path(comment, parent_path)
+    Comment.objects.filter(pk=comment.pk).update(path=comment.path)
+
+
+def _threaded(queryset):
+    # глубина считается в базе, чтобы страница осталась QuerySet
+    depth = Length("path") - Length(
+        Replace("path", Value(SEPARATOR), Value("")))
+    return queryset.select_related("author").annotate(
+        depth=depth).order_by("path")
+
+
+def page(post_id, after=None, per_page=None):
+    """Комментарии поста в порядке обсуждения после курсора after.
+
+    Возвращает QuerySet страницы и курсор следующей (или None).
+    """
+    per_page = per_page or PER_PAGE
+    queryset = Comment.objects.filter(post=post_id)
+    if after:
+        queryset = queryset.filter(path__gt=after)
+    comments = _threaded(queryset)[:per_page]
+    cursor = None
+    if len(comments) == per_page:
+        last = comments[per_page - 1].path
+        if queryset.filter(path__gt=last).exists():
+            cursor = last
+    return comments, cursor
+
+
+def thread(comment):
+    """Комментарий со всеми ответами на него."""
+    return _threaded(Comment.objects.filter(
+        post=comment.post_id, path__gte=comment.path,
+        path__lt=comment.path + AFTER_SEPARATOR))
+
+
+def rebuild_paths(batch_size=5000):
+    """Пересчитывает path всех комментариев (после bulk_create)."""
+    # в памяти держим пути только тех, на кого отвечали
+    parents = set(Comment.objects.filter(parent__isnull=False).values_list(
+        "parent_id", flat=True))
+    paths = {}
+    batch = []
+    # родитель создан раньше ответа, поэтому его путь уже известен
+    for comment in Comment.objects.order_by("created", "pk").only(
+            "pk", "created", "parent_id", "path").iterator(
+            chunk_size=batch_size):
+        path = make_path(comment, paths.get(comment.parent_id))
+        if comment.pk in parents:
+            paths[comment.pk] = path
+        if comment.path != path:
+            comment.path = path
+            batch.append(comment)
+        if len(batch) >= batch_size:
+            Comment.objects.bulk_update(batch, ["path"])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ["path"])
@@ -0,0 +1,180 @@
+"""Условные GET-запросы для страниц чтения.
+
+Каждой странице соответствует функция-валидатор: она дешёвым
+индексированным запросом собирает признаки данных страницы (дату
+последнего поста, время правки поста, число комментариев) и версии лент
+из posts.caching. Из них, зрителя и адреса страницы складывается ETag;
+если он совпал с If-None-Match, представление не вызывается и шаблон не
+рендерится — ответ 304.
+
+На лентах в ETag входят и версии карточек постов страницы: поста, его
+группы и автора. Какие карточки на странице, известно только после
+рендеринга, поэтому post_cards записывает их версии в запрос, декоратор
+запоминает имена в кеше по адресу и зрителю, а следующий запрос сверяет
+с текущими версиями. Так комментарий к посту меняет ETag только тех
+страниц, где видна его карточка.
+
+Страницы зависят от зрителя, поэтому ответ помечается
+``Cache-Control: private, no-cache``: браузер хранит страницу у себя, но
+каждый раз спрашивает сервер. Last-Modified не отдаётся: удаление поста
+не делает дату последнего поста новее, а ETag это учитывает.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers, quote_etag)
+
+from . import caching
+from .models import FeedEntry, Follow, Group, Post, User, UserStats
+
+
+def make_etag(request, parts):
+    # CSRF-токен входит в ключ: сохранённые формы должны пройти проверку
+    raw = "|".join(str(part) for part in (
+        request.user.pk, request.META.get("CSRF_COOKIE"),
+        request.get_full_path(), *parts))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def _cards_key(request):
+    raw = f"{request.user.pk}|{request.get_full_path()}"
+    return caching.etag_cards_key(hashlib.md5(raw.encode()).hexdigest())
+
+
+def _known_cards(request):
+    """Текущие версии карточек, показанных на странице в прошлый раз."""
+    names = cache.get(_cards_key(request))
+    if names is None:
+        return None
+    return sorted(caching.versions(names).items())
+
+
+def etag(validator, cards=False):
+    """Отвечает 304, если ETag из ``validator`` не изменился.
+
+    ``validator`` принимает аргументы представления и возвращает список
+    признаков страницы или None, если проверять нечего (например, объекта
+    нет — тогда представление само ответит 404). С ``cards`` в ETag
+    входят версии карточек постов, отрендеренных на странице.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            parts = validator(request, *args, **kwargs)
+            if parts is None:
+                return view(request, *args, **kwargs)
+            known = _known_cards(request) if cards else []
+            response = None
+            if known is not None:
+                value = make_etag(request, [*parts, *known])
+                response = get_conditional_response(request, etag=value)
+            if response is None:
+                if cards:
+                    request.card_versions = {}
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if cards:
+                    # версии, с которыми карточки действительно рисовались
+                    rendered = request.card_versions
+                    cache.set(_cards_key(request), list(rendered),
+                              caching.TIMEOUT)
+                    parts = [*parts, *sorted(rendered.items())]
+                # форма на странице могла выдать новый CSRF-токен
+                response["ETag"] = make_etag(request, parts)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return wrapper
+    return decorator
+
+
+def _one(queryset):
+    # выборка по уникальному ключу: сортировка из first() только мешает плану
+    rows = list(queryset.order_by()[:1])
+    return rows[0] if rows else None
+
+
+def _latest(queryset):
+    return Subquery(queryset.order_by("-pub_date").values("pub_date")[:1])
+
+
+def index(request):
+    latest = Post.objects.order_by("-pub_date").values_list(
+        "pub_date", flat=True).first()
+    return [latest, caching.version(caching.index_feed())]
+
+
+def trending(request):
+    # рейтинг меняется только при пересчёте, удаление поста — с версией
+    # главной
+    found = caching.versions([caching.trending_feed(), caching.index_feed()])
+    return sorted(found.items())
+
+
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).annotate(
+        latest=_latest(Post.objects.filter(group=OuterRef("pk"))))
+    group = _one(group.values_list("pk", "latest"))
+    if group is None:
+        return None
+    pk, latest = group
+    return [latest, caching.version(caching.group_feed(pk))]
+
+
+def profile(request, username):
+    authors = User.objects.filter(username=username).annotate(
+        latest=_latest(Post.objects.filter(author=OuterRef("pk"))))
+    fields = ["pk", "latest", "stats__posts_count", "stats__followers_count",
+              "stats__following_count"]
+    if request.user.is_authenticated:
+        authors = authors.annotate(viewer_follows=Exists(Follow.objects.filter(
+            user=request.user.pk, author=OuterRef("pk"))))
+        fields.append("viewer_follows")
+    author = _one(authors.values_list(*fields))
+    if author is None:
+        return None
+    return [*author, caching.version(caching.author_feed(author[0]))]
+
+
+def post_view(request, username, post_id):
+    post = _one(Post.objects.filter(
+        pk=post_id, author__username=username).values_list(
+        "updated", "comment_count", "author_id",
+        "author__stats__posts_count", "author__stats__followers_count",
+        "author__stats__following_count"))
+    if post is None:
+        return None
+    return [*post, caching.version(caching.post_name(post_id))]
+
+
+def comment_thread(request, username, post_id, comment_id):
+    return post_view(request, username, post_id)
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return None
+    # лента дополняется задачами очереди уже после подписки и отписки,
+    # поэтому кроме даты последней записи учитывается и их число
+    latest = FeedEntry.objects.filter(user=request.user).aggregate(
+        Max("pub_date"), Count("pk"))
+    # правки постов видны по версии главной ленты, отписки — по счётчику
+    following = UserStats.objects.filter(user=request.user).values_list(
+        "following_count", flat=True).first()
+    return [latest["pub_date__max"], latest["pk__count"], following,
+            caching.version(caching.index_feed())]
+
+
+def search_posts(request):
+    # запрос уже в адресе страницы, выдача меняется с любым постом
+    return [caching.version(caching.index_feed())]
+
+
+def group_index(request):
+    return [caching.version(caching.group_directory())]
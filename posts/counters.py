@@ -0,0 +1,65 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным UPDATE ... SET x = x + 1 при создании и
+удалении Post, Comment и Follow, поэтому страница профиля не делает
+COUNT по большим таблицам. recount() пересчитывает всё целиком.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef("pk")}).order_by().values(
+            field).annotate(total=Count("pk")).values("total")), 0)
+
+
+def _user_counts(user_id):
+    return {
+        "posts_count": Post.objects.filter(author=user_id).count(),
+        "followers_count": Follow.objects.filter(author=user_id).count(),
+        "following_count": Follow.objects.filter(user=user_id).count(),
+    }
+
+
+def for_user(user):
+    """Счётчики пользователя; недостающая строка создаётся пересчётом."""
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(
+            user=user, defaults=_user_counts(user.pk))
+        return stats
+
+
+def bump_user(user_id, **deltas):
+    # строки может не быть: её создаст for_user() уже с верными значениями
+    queryset = UserStats.objects.filter(user=user_id)
+    for field, delta in deltas.items():
+        if delta < 0:
+            queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(
+        **{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def bump_comments(post_id, delta):
+    queryset = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        queryset = queryset.filter(comment_count__gte=-delta)
+    queryset.update(comment_count=F("comment_count") + delta)
+
+
+def recount():
+    """Пересчитывает все счётчики пакетными UPDATE с подзапросами."""
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in User.objects.filter(
+            stats__isnull=True).values_list("pk", flat=True).iterator()),
+        ignore_conflicts=True)
+    UserStats.objects.update(
+        posts_count=_count(Post.objects.all(), "author"),
+        followers_count=_count(Follow.objects.all(), "author"),
+        following_count=_count(Follow.objects.all(), "user"),
+    )
+    Post.objects.update(comment_count=_count(Comment.objects.all(), "post"))
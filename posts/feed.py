@@ -0,0 +1,102 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Каждый новый пост раскладывается по лентам подписчиков автора, поэтому
+страница /follow/ читается одним диапазонным запросом по индексу
+(user, -pub_date) вместо join через Follow.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+
+from . import tasks
+from .models import FeedEntry, Follow, Post
+
+BATCH_SIZE = 1000
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author=post.author_id).values_list("user_id", flat=True)
+    batch = []
+    for user_id in followers.iterator(chunk_size=BATCH_SIZE):
+        batch.append(FeedEntry(user_id=user_id, post_id=post.pk,
+                               author_id=post.author_id,
+                               pub_date=post.pub_date))
+        if len(batch) >= BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    if batch:
+        _bulk_insert(batch)
+
+
+@tasks.task
+def fan_out_post(post_id):
+    """Задача: раскладывает пост по лентам, если он ещё существует."""
+    post = Post.objects.filter(pk=post_id).only(
+        "author_id", "pub_date").order_by()[:1]
+    for post in post:
+        fan_out(post)
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту пользователя постами автора после подписки."""
+    posts = Post.objects.filter(author=author_id).values_list(
+        "id", "pub_date")
+    batch = []
+    for post_id, pub_date in posts.iterator(chunk_size=BATCH_SIZE):
+        batch.append(FeedEntry(user_id=user_id, post_id=post_id,
+                               author_id=author_id, pub_date=pub_date))
+        if len(batch) >= BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    if batch:
+        _bulk_insert(batch)
+
+
+@tasks.task
+def follow_backfill(user_id, author_id):
+    """Задача: заполняет ленту, если подписка ещё не отменена."""
+    if Follow.objects.filter(user=user_id, author=author_id).exists():
+        backfill(user_id, author_id)
+
+
+@tasks.task
+def trim(user_id, author_id):
+    """Убирает посты автора из ленты пользователя после отписки."""
+    FeedEntry.objects.filter(user=user_id, author=author_id).delete()
+
+
+def feed_posts(user):
+    # аннотации переиспользуют join из filter(), поэтому сортировка и
+    # курсор идут по индексу (user, -pub_date, -post) ленты
+    return Post.objects.filter(feed_entries__user=user).annotate(
+        feed_date=F("feed_entries__pub_date"),
+        feed_post=F("feed_entries__post"),
+    ).order_by("-feed_date", "-feed_post")
+
+
+def size(user):
+    """Число постов в ленте без GROUP BY по аннотированному запросу."""
+    return FeedEntry.objects.filter(user=user).count()
+
+
+@transaction.atomic
+def rebuild():
+    """Пересобирает все ленты с нуля одним INSERT ... SELECT."""
+    FeedEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO {feed} (user_id, post_id, author_id, pub_date) "
+            "SELECT f.user_id, p.id, p.author_id, p.pub_date "
+            "FROM {follow} f INNER JOIN {post} p "
+            "ON p.author_id = f.author_id".format(
+                feed=FeedEntry._meta.db_table,
+                follow=Follow._meta.db_table,
+                post=Post._meta.db_table,
+            )
+        )
+    return FeedEntry.objects.count()
@@ -1,7 +1,14 @@
 from django import forms
+from . import moderation
 from .models import Post, Comment
 
 
+def clean_words(text):
+    if moderation.check(text):
+        raise forms.ValidationError("Удалите плохое слово из текста!")
+    return text
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
@@ -18,12 +25,7 @@ class PostForm(forms.ModelForm):
                      }
 
     def clean_text(self):
-        data = self.cleaned_data['text']
-
-        if "дурак" in data.lower():
-            raise forms.ValidationError("Удалите плохое слово из текста!")
-
-        return data
+        return clean_words(self.cleaned_data['text'])
 
 
 class CommentForm(forms.ModelForm):
@@ -39,3 +41,6 @@ class CommentForm(forms.ModelForm):
         help_texts = {
             "text": "Ваш комментарий тут"
         }
+
+    def clean_text(self):
+        return clean_words(self.cleaned_data["text"])
@@ -0,0 +1,84 @@
+"""Сводная таблица для каталога групп.
+
+Число постов, время последнего поста и самые активные авторы каждой
+группы считаются одним проходом по Post и записываются в GroupStats.
+Страница /groups/ читает только эту таблицу (и кеш), поэтому её
+стоимость не зависит от числа постов. refresh() запускается
+периодически командой refresh_group_stats.
+"""
+import heapq
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from yatube import routers
+from yatube.metrics import record_cache
+
+from . import caching
+from .models import Group, GroupStats, Post
+
+TOP_AUTHORS = 3
+BATCH_SIZE = 1000
+
+
+def _top_authors():
+    # постов на автора в группе; храним только TOP_AUTHORS лучших
+    rows = Post.objects.filter(group__isnull=False).order_by().values_list(
+        "group", "author__username").annotate(posts=Count("pk"))
+    top = {}
+    for group_id, username, posts in rows.iterator(chunk_size=BATCH_SIZE):
+        heap = top.setdefault(group_id, [])
+        item = (posts, username)
+        if len(heap) < TOP_AUTHORS:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heappushpop(heap, item)
+    return {
+        group_id: [{"username": username, "posts": posts}
+                   for posts, username in sorted(
+                       heap, key=lambda item: (-item[0], item[1]))]
+        for group_id, heap in top.items()
+    }
+
+
+def refresh():
+    """Пересчитывает GroupStats для всех групп; возвращает их число."""
+    now = timezone.now()
+    totals = {
+        group_id: (posts, last)
+        for group_id, posts, last in Post.objects.filter(
+            group__isnull=False).order_by().values_list("group").annotate(
+            posts=Count("pk"), last=Max("pub_date")).values_list(
+            "group", "posts", "last")
+    }
+    authors = _top_authors()
+    rows = []
+    for group_id in Group.objects.values_list("pk", flat=True).iterator():
+        posts, last = totals.get(group_id, (0, None))
+        rows.append(GroupStats(
+            group_id=group_id, posts_count=posts, last_post_at=last,
+            top_authors=json.dumps(authors.get(group_id, []),
+                                   ensure_ascii=False),
+            refreshed=now))
+    with transaction.atomic():
+        GroupStats.objects.all().delete()
+        GroupStats.objects.bulk_create(rows)
+    caching.bump(caching.group_directory())
+    return len(rows)
+
+
+def directory():
+    """Строки каталога групп, из кеша до следующего пересчёта."""
+    key = caching.directory_key(caching.version(caching.group_directory()))
+    groups = cache.get(key)
+    record_cache("directory", int(groups is not None), int(groups is None))
+    if groups is None:
+        # группы, ещё не попавшие в пересчёт, идут в конце
+        with routers.primary():
+            groups = list(Group.objects.select_related("stats").order_by(
+                F("stats__posts_count").desc(nulls_last=True), "title"))
+        cache.set(key, groups, caching.TIMEOUT)
+    return groups
@@ -0,0 +1,219 @@
+"""Фоновая обработка картинок постов.
+
+После сохранения PostForm картинка уходит в пул потоков (без
+TASKS_EAGER — в очередь posts.tasks): из оригинала удаляются метаданные
+(EXIF и т.п.; очищенная копия подменяет оригинал в строке поста, а уже
+очищенные файлы пропускаются), заранее строятся все нужные шаблонам
+миниатюры, а их адреса и размеры записываются в Post.image_variants.
+Шаблоны берут готовые адреса и никогда не ждут Pillow; пока обработка не
+закончена, показывается оригинал.
+"""
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+from sorl.thumbnail import get_thumbnail
+
+from . import caching, tasks
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# карточка поста: базовый размер и ширины для srcset
+CARD_SIZE = (960, 339)
+CARD_WIDTHS = (480, 960, 1440)
+# форматы вариантов: ключ в srcset -> формат sorl
+VARIANT_FORMATS = {"jpeg": "JPEG", "webp": "WEBP"}
+# форматы, в которых бывают метаданные и которые можно пересохранить
+STRIP_FORMATS = {"JPEG", "PNG", "WEBP"}
+SAVE_OPTIONS = {"JPEG": {"quality": 90}}
+# очищенная копия кладётся в подкаталог рядом с оригиналом: имя файла
+# задаёт пользователь, а каталог — нет, так что пометку не подделать
+STRIPPED_DIR = "clean"
+
+_executor = None
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "queued": 0,
+    "processed": 0,
+    "failed": 0,
+    "seconds_total": 0.0,
+    "seconds_max": 0.0,
+}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                thread_name_prefix="images")
+        return _executor
+
+
+def stats():
+    """Текущая глубина очереди и время обработки."""
+    with _stats_lock:
+        result = dict(_stats)
+    result["queue_depth"] = result["queued"] - (
+        result["processed"] + result["failed"])
+    return result
+
+
+def is_stripped(name):
+    return os.path.basename(os.path.dirname(name)) == STRIPPED_DIR
+
+
+def strip_metadata(image_field):
+    """Сохраняет копию картинки без метаданных, сохраняя ориентацию.
+
+    Оригинал не трогается: копия ложится под новым именем, и image_field
+    указывает на неё. Возвращает новое имя или None, если очищать нечего.
+    """
+    if is_stripped(image_field.name):
+        return None
+    image_field.open("rb")
+    try:
+        image = Image.open(image_field)
+        image_format = image.format
+        if image_format not in STRIP_FORMATS:
+            return None
+        image = ImageOps.exif_transpose(image)
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format,
+                   **SAVE_OPTIONS.get(image_format, {}))
+    finally:
+        image_field.close()
+    directory, filename = os.path.split(image_field.name)
+    saved = image_field.storage.save(
+        os.path.join(directory, STRIPPED_DIR, filename),
+        ContentFile(buffer.getvalue()))
+    image_field.name = saved
+    return saved
+
+
+def generate_variants(image_field):
+    """Строит карточку в нескольких ширинах и форматах.
+
+    Результат хранится в Post.image_variants, чтобы шаблон собирал
+    <picture> со srcset без обращений к хранилищу.
+    """
+    base_width, base_height = CARD_SIZE
+    card = {}
+    srcset = {}
+    for key, image_format in VARIANT_FORMATS.items():
+        widths = {}
+        for width in CARD_WIDTHS:
+            height = round(width * base_height / base_width)
+            thumbnail = get_thumbnail(
+                image_field, f"{width}x{height}", crop="center",
+                upscale=width <= base_width, format=image_format)
+            # без увеличения крупные варианты маленькой картинки совпадают
+            widths.setdefault(thumbnail.width, thumbnail.url)
+            if key == "jpeg" and width == base_width:
+                card = {
+                    "url": thumbnail.url,
+                    "width": thumbnail.width,
+                    "height": thumbnail.height,
+                }
+        srcset[key] = ", ".join(
+            f"{url} {width}w" for width, url in sorted(widths.items()))
+    card["srcset"] = srcset
+    return {"card": card}
+
+
+def _record(outcome, elapsed):
+    with _stats_lock:
+        _stats[outcome] += 1
+        _stats["seconds_total"] += elapsed
+        _stats["seconds_max"] = max(_stats["seconds_max"], elapsed)
+
+
+@tasks.task
+def process(post_id):
+    started = time.monotonic()
+    outcome = "processed"
+    try:
+        post = Post.objects.filter(pk=post_id).only("image").first()
+        if post is None or not post.image:
+            return
+        original, storage = post.image.name, post.image.storage
+        stripped = strip_metadata(post.image)
+        try:
+            fields = {"image_variants": json.dumps(
+                generate_variants(post.image))}
+            if stripped:
+                fields["image"] = stripped
+            # пока шла обработка, автор мог загрузить другую картинку:
+            # тогда строку не трогаем, её обработает задача новой картинки
+            updated = Post.objects.filter(
+                pk=post_id, image=original).update(**fields)
+        except Exception:
+            if stripped:
+                storage.delete(stripped)
+            raise
+        if stripped:
+            # до подмены читатели видели оригинал, теперь он не нужен
+            storage.delete(original if updated else stripped)
+        if updated:
+            caching.bump(caching.post_name(post_id))
+    except Exception:
+        # очередь должна увидеть сбой, чтобы повторить задачу
+        outcome = "failed"
+        raise
+    finally:
+        _record(outcome, time.monotonic() - started)
+
+
+def process_logged(post_id):
+    """Обрабатывает картинку, записывая сбой в лог вместо исключения.
+
+    Для пула потоков, обработки без очереди и process_images: там
+    повторять задачу некому, а один битый файл не должен остановить
+    остальные.
+    """
+    try:
+        process(post_id)
+    except Exception:
+        logger.exception("Не удалось обработать картинку поста %s", post_id)
+        return False
+    return True
+
+
+def _process_in_thread(post_id):
+    try:
+        process_logged(post_id)
+    finally:
+        # у каждого потока пула своё соединение с БД
+        connection.close()
+
+
+def schedule(post):
+    """Ставит обработку картинки поста в очередь после коммита."""
+    if not post.image:
+        return
+    post_id = post.pk
+    if not settings.TASKS_EAGER:
+        # задача станет видна воркерам вместе с коммитом поста
+        tasks.enqueue(process, post_id)
+        return
+
+    def submit():
+        with _stats_lock:
+            _stats["queued"] += 1
+        if settings.IMAGE_PIPELINE_EAGER:
+            process_logged(post_id)
+        else:
+            _get_executor().submit(_process_in_thread, post_id)
+
+    transaction.on_commit(submit)
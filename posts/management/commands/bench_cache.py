@@ -0,0 +1,73 @@
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from yatube.cache_backends import SQLiteCache
+
+
+def measure(operation, repeat):
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        operation(i)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "mean_us": statistics.mean(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6,
+    }
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает задержки LocMemCache и общего SQLite-кеша "
+            "на чтении, промахах и записи")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5000)
+        parser.add_argument("--keys", type=int, default=1000)
+        parser.add_argument("--value-size", type=int, default=2048)
+        parser.add_argument("--json", action="store_true",
+                            help="вывести результат в JSON")
+
+    def handle(self, *args, **options):
+        repeat, keys = options["repeat"], options["keys"]
+        value = "x" * options["value_size"]
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                "locmem": LocMemCache(
+                    "bench", {"OPTIONS": {"MAX_ENTRIES": keys * 2}}),
+                "sqlite": SQLiteCache(
+                    os.path.join(directory, "cache.sqlite3"),
+                    {"OPTIONS": {"MAX_ENTRIES": keys * 2}}),
+            }
+            results = {}
+            for name, cache in backends.items():
+                cache.set_many({f"key{i}": value for i in range(keys)})
+                many = [f"key{i}" for i in range(10)]
+                results[name] = {
+                    "get_hit": measure(
+                        lambda i: cache.get(f"key{i % keys}"), repeat),
+                    "get_miss": measure(
+                        lambda i: cache.get(f"missing{i}"), repeat),
+                    "get_many_10": measure(
+                        lambda i: cache.get_many(many), repeat),
+                    "set": measure(
+                        lambda i: cache.set(f"key{i % keys}", value), repeat),
+                }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, operations in results.items():
+            for operation, stats in operations.items():
+                self.stdout.write(
+                    f"{name:8} {operation:12} "
+                    f"mean {stats['mean_us']:8.1f} us  "
+                    f"p50 {stats['p50_us']:8.1f} us  "
+                    f"p99 {stats['p99_us']:8.1f} us")
@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube.db import apply_sqlite_pragmas
+
+SCHEMA = """
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL,
+    author_id INTEGER NOT NULL,
+    pub_date REAL NOT NULL
+);
+CREATE INDEX post_author_pub_date ON post (author_id, pub_date DESC);
+CREATE INDEX post_pub_date ON post (pub_date DESC);
+"""
+READ = "SELECT id, text FROM post ORDER BY pub_date DESC LIMIT 10"
+READ_AUTHOR = ("SELECT id, text FROM post WHERE author_id = ? "
+               "ORDER BY pub_date DESC LIMIT 10")
+WRITE = "INSERT INTO post (text, author_id, pub_date) VALUES (?, ?, ?)"
+AUTHORS = 100
+
+
+def connect(path, pragmas, timeout):
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                           check_same_thread=False)
+    apply_sqlite_pragmas(conn.cursor(), pragmas)
+    return conn
+
+
+def run(path, pragmas, readers, writers, seconds, timeout):
+    """Гоняет читателей и писателей параллельно, считает операции."""
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    latencies = {"reads": [], "writes": []}
+    lock = threading.Lock()
+
+    def worker(kind):
+        conn = connect(path, pragmas, timeout)
+        done, errors, timings = 0, 0, []
+        i = 0
+        while not stop.is_set():
+            i += 1
+            started = time.perf_counter()
+            try:
+                if kind == "reads":
+                    conn.execute(READ).fetchall()
+                    conn.execute(
+                        READ_AUTHOR, (i % AUTHORS,)).fetchall()
+                else:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(WRITE, ("текст " * 20, i % AUTHORS,
+                                         time.time()))
+                    conn.execute("COMMIT")
+                done += 1
+                timings.append(time.perf_counter() - started)
+            except sqlite3.OperationalError:
+                errors += 1
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+        conn.close()
+        with lock:
+            counts[kind] += done
+            counts["errors"] += errors
+            latencies[kind].extend(timings)
+
+    threads = [threading.Thread(target=worker, args=("reads",))
+               for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=("writes",))
+                for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = {
+        "reads_per_s": counts["reads"] / seconds,
+        "writes_per_s": counts["writes"] / seconds,
+        "errors": counts["errors"],
+    }
+    for kind, timings in latencies.items():
+        timings.sort()
+        if timings:
+            result[f"{kind}_p99_ms"] = timings[
+                int(len(timings) * 0.99)] * 1e3
+    return result
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает пропускную способность SQLite при параллельном "
+            "чтении и записи с настройками по умолчанию и с SQLITE_PRAGMAS")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--rows", type=int, default=20000)
+        parser.add_argument("--timeout", type=float, default=5,
+                            help="ожидание блокировки, секунды")
+        parser.add_argument("--json", action="store_true",
+                            help="вывести результат в JSON")
+
+    def handle(self, *args, **options):
+        variants = {
+            # режим журнала и синхронизация SQLite по умолчанию
+            "default": {"journal_mode": "DELETE", "synchronous": "FULL"},
+            "tuned": settings.SQLITE_PRAGMAS,
+        }
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, pragmas in variants.items():
+                path = os.path.join(directory, f"{name}.sqlite3")
+                conn = connect(path, pragmas, options["timeout"])
+                conn.executescript(SCHEMA)
+                conn.execute("BEGIN")
+                conn.executemany(WRITE, (
+                    ("текст " * 20, i % AUTHORS, time.time() - i)
+                    for i in range(options["rows"])))
+                conn.execute("COMMIT")
+                conn.close()
+                results[name] = run(
+                    path, pragmas, options["readers"], options["writers"],
+                    options["seconds"], options["timeout"])
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:8} чтений {stats['reads_per_s']:9.0f}/с  "
+                f"записей {stats['writes_per_s']:7.0f}/с  "
+                f"p99 чтения {stats.get('reads_p99_ms', 0):7.2f} мс  "
+                f"p99 записи {stats.get('writes_p99_ms', 0):7.2f} мс  "
+                f"ошибок {stats['errors']}")
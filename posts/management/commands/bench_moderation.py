@@ -0,0 +1,84 @@
+import json
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import moderation
+
+LETTERS = "абвгдежзийклмнопрстуфхцчшщыэюя"
+
+
+def random_word(rng, low=3, high=10):
+    return "".join(rng.choice(LETTERS)
+                   for _ in range(rng.randint(low, high)))
+
+
+def best_of(operation, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1e3
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает фильтр запрещённых слов (автомат Ахо — Корасик) "
+            "с поиском каждого слова по отдельности на длинных текстах")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--terms", type=int, default=5000,
+                            help="слов в словаре")
+        parser.add_argument("--lengths", type=int, nargs="+",
+                            default=[1000, 10000, 100000],
+                            help="длины текстов в символах")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--json", action="store_true",
+                            help="вывести результат в JSON")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        # словарь из слов длиннее любых слов текста: совпадений нет, и
+        # каждый способ проходит текст целиком — худший случай
+        terms = [random_word(rng, 11, 14) + rng.choice(("", "*"))
+                 for _ in range(options["terms"])]
+        vocabulary = [random_word(rng) for _ in range(2000)]
+        repeat = options["repeat"]
+
+        started = time.perf_counter()
+        matcher = moderation.Matcher(terms)
+        build_ms = (time.perf_counter() - started) * 1e3
+        keys = [moderation.normalize(term.rstrip("*")) for term in terms]
+        pattern = re.compile(
+            r"\b(?:" + "|".join(map(re.escape, keys)) + ")")
+
+        results = {"terms": len(terms), "build_ms": build_ms, "texts": []}
+        for length in options["lengths"]:
+            words = []
+            while sum(map(len, words)) + len(words) < length:
+                words.append(rng.choice(vocabulary))
+            text = " ".join(words)[:length]
+            normalized = moderation.normalize(text)
+            results["texts"].append({
+                "length": length,
+                "automaton_ms": best_of(lambda: matcher.find(text), repeat),
+                "substring_ms": best_of(
+                    lambda: any(key in normalized for key in keys), repeat),
+                "regex_ms": best_of(
+                    lambda: pattern.search(normalized), repeat),
+            })
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"слов в словаре: {results['terms']}, "
+                          f"сборка автомата {build_ms:.1f} мс")
+        for row in results["texts"]:
+            self.stdout.write(
+                f"{row['length']:8} симв.  "
+                f"автомат {row['automaton_ms']:9.2f} мс  "
+                f"по словам {row['substring_ms']:9.2f} мс  "
+                f"regex {row['regex_ms']:9.2f} мс")
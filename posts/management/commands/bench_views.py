@@ -0,0 +1,209 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+VIEWS = ("index", "trending", "group_posts", "profile", "post_view",
+         "follow_index", "new_post", "add_comment", "api_posts",
+         "api_group_posts", "api_comments")
+
+
+def percentile(timings, share):
+    # timings уже отсортированы
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "mean_ms": statistics.mean(timings) * 1e3,
+        "p50_ms": percentile(timings, 0.5) * 1e3,
+        "p90_ms": percentile(timings, 0.9) * 1e3,
+        "p99_ms": percentile(timings, 0.99) * 1e3,
+        "max_ms": timings[-1] * 1e3,
+        "rps": len(timings) / sum(timings),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_targets():
+    """Пользователь, пост и группа, на которых меряются страницы."""
+    # самый активный читатель и самая обсуждаемая запись
+    stats = UserStats.objects.order_by("-following_count").first()
+    post = Post.objects.order_by("-comment_count", "-pk").first()
+    group = Group.objects.filter(posts__isnull=False).first()
+    if stats is None or post is None or group is None:
+        raise CommandError(
+            "Нужны пользователи, посты и группы: запустите seed_data")
+    return {"user": stats.user, "post": post, "group": group}
+
+
+def view_request(name, targets):
+    """Метод, адрес и данные запроса к странице name."""
+    post, group = targets["post"], targets["group"]
+    username = post.author.username
+    if name == "index":
+        return "get", reverse("index"), None
+    if name == "trending":
+        return "get", reverse("trending"), None
+    if name == "group_posts":
+        return "get", reverse("group_posts", args=[group.slug]), None
+    if name == "profile":
+        return "get", reverse("profile", args=[username]), None
+    if name == "post_view":
+        return "get", reverse("post_view", args=[username, post.pk]), None
+    if name == "follow_index":
+        return "get", reverse("follow_index"), None
+    # JSON API для сравнения с HTML-страницами выше
+    if name == "api_posts":
+        return "get", reverse("api_posts"), None
+    if name == "api_group_posts":
+        return "get", reverse("api_posts") + f"?group={group.slug}", None
+    if name == "api_comments":
+        return "get", reverse("api_comments", args=[post.pk]), None
+    if name == "new_post":
+        return "post", reverse("new_post"), {
+            "text": "Пост нагрузочного теста", "group": group.pk}
+    return "post", reverse("add_comment", args=[username, post.pk]), {
+        "text": "Комментарий нагрузочного теста"}
+
+
+class Command(BaseCommand):
+    help = ("Измеряет задержки (перцентили), число запросов к БД и пик "
+            "памяти на запрос для основных страниц. Страницы записи "
+            "создают посты и комментарии, запускайте на тестовой базе "
+            "(см. seed_data)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200,
+                            help="замеров на страницу")
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--views", nargs="+", choices=VIEWS,
+                            default=list(VIEWS))
+        parser.add_argument("--cold", action="store_true",
+                            help="очищать кеш перед каждым запросом")
+        parser.add_argument("--json", action="store_true",
+                            help="вывести результат в JSON")
+        parser.add_argument("--output", help="сохранить JSON в файл")
+        parser.add_argument("--compare",
+                            help="JSON прошлого прогона для сравнения")
+
+    def handle(self, *args, **options):
+        targets = find_targets()
+        client = Client()
+        client.force_login(targets["user"])
+
+        results = {}
+        # debug_toolbar включается при DEBUG и сильно искажает замеры;
+        # лимит записей остановил бы повторные запросы ответом 429
+        with override_settings(DEBUG=False, RATE_LIMIT_ENABLED=False):
+            for name in options["views"]:
+                request = view_request(name, targets)
+                results[name] = self.measure(
+                    client, request, options["requests"],
+                    options["warmup"], options["cold"])
+
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "cache": caches["default"].__class__.__name__,
+                "cold": options["cold"],
+                "requests": options["requests"],
+                "rows": {model.__name__: model.objects.count()
+                         for model in (User, Group, Post, Comment, Follow)},
+            },
+            "views": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                self.print_comparison(json.load(file), report)
+
+    def measure(self, client, request, repeat, warmup, cold):
+        method, url, data = request
+        send = getattr(client, method)
+
+        def call():
+            if cold:
+                cache.clear()
+            started = time.perf_counter()
+            response = send(url, data)
+            return response, time.perf_counter() - started
+
+        for _ in range(warmup):
+            call()
+        timings = [call()[1] for _ in range(repeat)]
+
+        # запросы и память меряются отдельно: их учёт замедляет запрос
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            try:
+                response, _ = call()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        result = summarize(timings)
+        result.update({
+            "status": response.status_code,
+            "queries": len(queries),
+            "memory_peak_kb": peak / 1024,
+            "response_kb": len(response.content) / 1024,
+        })
+        return result
+
+    def print_report(self, report):
+        meta = report["meta"]
+        self.stdout.write(
+            f"commit {meta['commit']}, {meta['database']}, "
+            f"{meta['cache']}, строк: {meta['rows']}")
+        for name, stats in report["views"].items():
+            self.stdout.write(
+                f"{name:13} p50 {stats['p50_ms']:7.2f} ms  "
+                f"p90 {stats['p90_ms']:7.2f} ms  "
+                f"p99 {stats['p99_ms']:7.2f} ms  "
+                f"{stats['rps']:7.1f} rps  "
+                f"{stats['queries']:3} запросов  "
+                f"{stats['memory_peak_kb']:8.1f} KB  "
+                f"HTTP {stats['status']}")
+
+    def print_comparison(self, baseline, report):
+        self.stdout.write(f"Сравнение с {baseline['meta'].get('commit')}:")
+        for name, stats in report["views"].items():
+            before = baseline["views"].get(name)
+            if before is None:
+                continue
+            changes = [
+                f"{key} {(stats[key] / before[key] - 1) * 100:+.1f}%"
+                for key in ("p50_ms", "p99_ms") if before[key]]
+            changes.append(f"запросов {before['queries']} -> "
+                           f"{stats['queries']}")
+            self.stdout.write(f"{name:13} " + ", ".join(changes))
@@ -0,0 +1,100 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from posts.management.commands.bench_views import (VIEWS, find_targets,
+                                                   view_request)
+
+# признаки плохого плана: полный проход по таблице и сортировка во
+# временном B-дереве (SQLite) или Seq Scan / Sort (PostgreSQL);
+# проход по индексу (SCAN ... USING INDEX) с LIMIT считается нормой
+PROBLEMS = {
+    "sqlite": (re.compile(r"\bSCAN (TABLE )?(?P<table>\w+)\b(?! USING)"),
+               re.compile(r"USE TEMP B-TREE")),
+    "postgresql": (re.compile(r"Seq Scan on (?P<table>\w+)"),
+                   re.compile(r"^\s*(->\s*)?Sort\b")),
+}
+EXPLAIN = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+# маленькие справочные таблицы, которые дешевле прочитать целиком
+SMALL_TABLES = {"django_site", "django_flatpage", "django_flatpage_sites"}
+# не таблицы, а результат подзапроса: так Django считает COUNT по срезу
+# с LIMIT, и проход по нему ограничен этим LIMIT
+DERIVED = {"subquery"}
+
+
+class Command(BaseCommand):
+    help = ("Выполняет EXPLAIN для всех запросов основных страниц и "
+            "завершается с ошибкой, если есть полный проход по таблице "
+            "или сортировка во временной структуре")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--views", nargs="+", choices=VIEWS,
+                            default=list(VIEWS))
+        parser.add_argument("--verbose-plans", action="store_true",
+                            help="печатать планы всех запросов")
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in PROBLEMS:
+            raise CommandError(f"EXPLAIN для {vendor} не поддерживается")
+        targets = find_targets()
+        client = Client()
+        client.force_login(targets["user"])
+
+        failures = 0
+        for name in options["views"]:
+            queries = self.capture(client, view_request(name, targets))
+            self.stdout.write(f"{name}: {len(queries)} SELECT")
+            for sql, params in queries:
+                plan = self.explain(vendor, sql, params)
+                problems = self.problems(vendor, plan)
+                if problems or options["verbose_plans"]:
+                    self.stdout.write(f"  {sql}")
+                    for line in plan:
+                        self.stdout.write(f"    {line}")
+                for problem in problems:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f"  ! {problem}"))
+
+        if failures:
+            raise CommandError(f"Плохих планов: {failures}")
+        self.stdout.write(self.style.SUCCESS("Все запросы идут по индексам"))
+
+    def capture(self, client, request):
+        method, url, data = request
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith("SELECT"):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        # страницы записи откатываются, чтобы не менять данные; лимит
+        # записей отключён, иначе вместо страницы был бы ответ 429
+        with transaction.atomic(), override_settings(
+                DEBUG=False, RATE_LIMIT_ENABLED=False):
+            with connection.execute_wrapper(record):
+                getattr(client, method)(url, data)
+            transaction.set_rollback(True)
+        return queries
+
+    def explain(self, vendor, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN[vendor] + sql, params)
+            rows = cursor.fetchall()
+        # у SQLite детали плана в последней колонке
+        return [str(row[-1]) for row in rows]
+
+    def problems(self, vendor, plan):
+        scan, sort = PROBLEMS[vendor]
+        found = []
+        for line in plan:
+            match = scan.search(line)
+            if match and match.group("table") not in SMALL_TABLES | DERIVED:
+                found.append(f"полный проход: {line.strip()}")
+            if sort.search(line):
+                found.append(f"сортировка: {line.strip()}")
+        return found
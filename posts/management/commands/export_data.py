@@ -0,0 +1,39 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = ("Выгружает пользователей, группы, посты, комментарии и "
+            "подписки в JSON Lines или CSV, по файлу на таблицу")
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--format", choices=bulk.FORMATS,
+                            default="jsonl")
+        parser.add_argument("--models", nargs="+", choices=list(bulk.FIELDS),
+                            default=list(bulk.FIELDS))
+        parser.add_argument("--batch-size", type=int,
+                            default=bulk.BATCH_SIZE)
+        parser.add_argument("--images", action="store_true",
+                            help="скопировать картинки постов в images/")
+        parser.add_argument("--resume", action="store_true",
+                            help="дописать файлы после последней записи")
+
+    def handle(self, *args, **options):
+        os.makedirs(options["directory"], exist_ok=True)
+        self.started = time.monotonic()
+        for name in options["models"]:
+            total = bulk.export(
+                name, options["directory"], fmt=options["format"],
+                resume=options["resume"], batch_size=options["batch_size"],
+                images=options["images"], progress=self.progress)
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: выгружено {total}"))
+
+    def progress(self, name, count):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f"{name}: {count} ({elapsed:.0f} с)")
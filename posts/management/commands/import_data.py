@@ -0,0 +1,63 @@
+import os
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import (bulk, comments, counters, feed, group_stats, search,
+                   trending)
+
+
+class Command(BaseCommand):
+    help = ("Загружает выгрузку export_data. Прерванная загрузка "
+            "продолжается с места остановки; после загрузки "
+            "пересобираются ленты, счётчики и поисковый индекс")
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--format", choices=bulk.FORMATS,
+                            default="jsonl")
+        parser.add_argument("--models", nargs="+", choices=list(bulk.FIELDS),
+                            default=list(bulk.FIELDS))
+        parser.add_argument("--batch-size", type=int,
+                            default=bulk.BATCH_SIZE)
+        parser.add_argument("--images", action="store_true",
+                            help="скопировать картинки из images/ в MEDIA")
+        parser.add_argument("--restart", action="store_true",
+                            help="начать заново, забыв прогресс")
+        parser.add_argument("--no-rebuild", action="store_true",
+                            help="не пересобирать ленты, счётчики и индекс")
+
+    def handle(self, *args, **options):
+        directory, fmt = options["directory"], options["format"]
+        missing = [name for name in options["models"] if not
+                   os.path.exists(bulk.data_path(directory, name, fmt))]
+        if missing:
+            raise CommandError(f"Нет файлов для: {', '.join(missing)}")
+        if options["restart"]:
+            bulk.reset_progress(directory)
+
+        self.started = time.monotonic()
+        for name in options["models"]:
+            total = bulk.load(
+                name, directory, fmt=fmt, batch_size=options["batch_size"],
+                images=options["images"], progress=self.progress)
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: прочитано {total}"))
+
+        if not options["no_rebuild"]:
+            self.stdout.write("Пересчёт лент, счётчиков и поискового индекса")
+            feed.rebuild()
+            counters.recount()
+            comments.rebuild_paths()
+            search.rebuild()
+            group_stats.refresh()
+            trending.rebuild()
+            cache.clear()
+        if options["images"]:
+            self.stdout.write(
+                "Миниатюры не переносятся: запустите process_images")
+
+    def progress(self, name, count):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f"{name}: {count} ({elapsed:.0f} с)")
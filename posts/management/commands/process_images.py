@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Готовит миниатюры для постов, у которых их ещё нет"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="обработать заново все картинки")
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["all"]:
+            posts = posts.filter(image_variants="")
+        total = failed = 0
+        for post_id in posts.values_list("pk", flat=True).iterator():
+            # битый файл пишется в лог и не останавливает остальные
+            if not images.process_logged(post_id):
+                failed += 1
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано картинок: {total}, ошибок: {failed}"))
@@ -0,0 +1,66 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from posts.management.commands.bench_views import (VIEWS, find_targets,
+                                                   view_request)
+from yatube import templating
+
+READ_VIEWS = [name for name in VIEWS
+              if not name.startswith("api_")
+              and name not in ("new_post", "add_comment")]
+
+
+class Command(BaseCommand):
+    help = ("Раскладывает время рендеринга страниц по шаблонам и include: "
+            "число вызовов, полное и собственное время на запрос")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50,
+                            help="запросов на страницу")
+        parser.add_argument("--views", nargs="+", choices=READ_VIEWS,
+                            default=READ_VIEWS)
+        parser.add_argument("--cold", action="store_true",
+                            help="очищать кеш, чтобы карточки рендерились "
+                                 "заново")
+        parser.add_argument("--json", action="store_true",
+                            help="вывести результат в JSON")
+
+    def handle(self, *args, **options):
+        targets = find_targets()
+        client = Client()
+        client.force_login(targets["user"])
+        count = options["requests"]
+
+        results = {}
+        with override_settings(DEBUG=False):
+            for name in options["views"]:
+                _, url, _ = view_request(name, targets)
+                client.get(url)
+                with templating.profile() as profile:
+                    for _ in range(count):
+                        if options["cold"]:
+                            cache.clear()
+                        client.get(url)
+                results[name] = [{
+                    "template": template,
+                    "calls": calls / count,
+                    "total_ms": total * 1e3 / count,
+                    "own_ms": own * 1e3 / count,
+                    "own_us_per_call": own * 1e6 / calls,
+                } for template, calls, total, own in profile.rows()]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, rows in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for row in rows:
+                self.stdout.write(
+                    f"  {row['template']:32} {row['calls']:6.1f} вызовов  "
+                    f"всего {row['total_ms']:7.2f} мс  "
+                    f"своё {row['own_ms']:7.2f} мс  "
+                    f"{row['own_us_per_call']:8.1f} мкс/вызов")
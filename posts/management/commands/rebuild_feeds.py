@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок с нуля"
+
+    def handle(self, *args, **options):
+        count = feed.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Лента пересобрана: {count} записей"))
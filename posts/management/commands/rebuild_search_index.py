@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Пересобирает поисковый индекс постов с нуля"
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Индекс пересобран: {count} терминов"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import group_stats
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает сводку каталога групп; запускайте по "
+            "расписанию, например раз в несколько минут")
+
+    def handle(self, *args, **options):
+        count = group_stats.refresh()
+        self.stdout.write(
+            self.style.SUCCESS(f"Сводка пересчитана: {count} групп"))
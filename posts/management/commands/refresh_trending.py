@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ("Добавляет к популярному новые комментарии и подписки; "
+            "запускайте по расписанию, например раз в минуту")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true",
+                            help="пересчитать с нуля по всей истории")
+
+    def handle(self, *args, **options):
+        refresh = trending.rebuild if options["full"] else trending.refresh
+        count = refresh()
+        self.stdout.write(
+            self.style.SUCCESS(f"Учтено событий: {count}"))
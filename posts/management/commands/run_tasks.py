@@ -0,0 +1,54 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import tasks
+
+
+def _work(burst, poll):
+    tasks.work(burst=burst, poll=poll)
+
+
+class Command(BaseCommand):
+    help = ("Запускает воркеры фоновой очереди задач (posts.tasks); "
+            "имеет смысл с TASKS_EAGER=0")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1,
+                            help="число процессов-воркеров")
+        parser.add_argument("--burst", action="store_true",
+                            help="выйти, когда готовых задач не останется")
+        parser.add_argument("--poll", type=float, default=1.0,
+                            help="пауза между проверками пустой очереди, с")
+        parser.add_argument("--stats", action="store_true",
+                            help="только показать состояние очереди")
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            for key, value in tasks.stats().items():
+                self.stdout.write(f"{key:24} {value}")
+            return
+
+        burst, poll = options["burst"], options["poll"]
+        if options["workers"] == 1:
+            done = tasks.work(burst=burst, poll=poll)
+            self.stdout.write(
+                self.style.SUCCESS(f"Выполнено задач: {done}"))
+            return
+
+        # дочерние процессы не должны унаследовать соединения родителя
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_work, args=(burst, poll),
+                                    name=f"tasks-{number}")
+            for number in range(options["workers"])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
@@ -0,0 +1,140 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from posts import (comments, counters, feed, group_stats, search,
+                   trending)
+from posts.bulk import explicit_dates
+from posts.models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    "день утро вечер город дорога море лес река кот собака книга фильм "
+    "музыка кофе чай работа отпуск поезд самолет погода солнце дождь снег "
+    "друг семья новость проект код идея вопрос ответ история фото прогулка "
+    "интересный новый старый большой маленький красивый быстрый тихий "
+    "читать писать смотреть слушать гулять думать ехать искать строить"
+).split()
+# посты распределены по последним DAYS дням
+DAYS = 365
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу синтетическими пользователями, группами, "
+            "постами, подписками и комментариями для нагрузочных тестов")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument("--follows", type=int, default=20,
+                            help="подписок на пользователя")
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="bench",
+                            help="префикс имён пользователей и групп")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.prefix = options["prefix"]
+        self.now = timezone.now()
+
+        users = self.create_users(options["users"])
+        groups = self.create_groups(options["groups"])
+        with explicit_dates():
+            posts = self.create_posts(options["posts"], users, groups)
+            self.create_comments(options["comments"], users, posts)
+            self.create_follows(options["follows"], users)
+
+        self.stdout.write("Пересчёт лент, счётчиков и поискового индекса")
+        feed.rebuild()
+        counters.recount()
+        comments.rebuild_paths()
+        search.rebuild()
+        group_stats.refresh()
+        trending.rebuild()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS("Готово"))
+
+    def insert(self, model, count, make):
+        """Вставляет count строк пакетами; возвращает диапазон их pk.
+
+        Объекты создаются по одному пакету, поэтому память не зависит от
+        count. bulk_create на SQLite не возвращает pk, поэтому диапазон
+        ищется среди pk больше максимального до вставки.
+        """
+        before = model.objects.aggregate(pk=Max("pk"))["pk"] or 0
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [make(start + i) for i in range(size)],
+                    ignore_conflicts=True)
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {start + size}/{count}")
+        inserted = model.objects.filter(pk__gt=before).aggregate(
+            first=Min("pk"), last=Max("pk"))
+        return inserted["first"] or 1, inserted["last"] or 0
+
+    def text(self, low, high):
+        return " ".join(self.random.choices(
+            WORDS, k=self.random.randint(low, high))).capitalize()
+
+    def moment(self):
+        seconds = self.random.randint(0, DAYS * 24 * 3600)
+        return self.now - timedelta(seconds=seconds)
+
+    def create_users(self, count):
+        # хешировать пароль на каждого пользователя слишком долго
+        password = make_password(None)
+        run = self.random.randrange(16 ** 6)
+        return self.insert(User, count, lambda i: User(
+            username=f"{self.prefix}_{run:06x}_{i}", password=password))
+
+    def create_groups(self, count):
+        run = self.random.randrange(16 ** 6)
+        return self.insert(Group, count, lambda i: Group(
+            title=f"{self.prefix} {run:06x} {i}",
+            slug=f"{self.prefix}-{run:06x}-{i}",
+            description=self.text(5, 20)))
+
+    def create_posts(self, count, users, groups):
+        def make(i):
+            group_id = None
+            if groups[0] <= groups[1] and self.random.random() < 0.7:
+                group_id = self.random.randint(*groups)
+            return Post(text=self.text(10, 60),
+                        author_id=self.random.randint(*users),
+                        group_id=group_id, pub_date=self.moment())
+        return self.insert(Post, count, make)
+
+    def create_comments(self, count, users, posts):
+        if posts[0] > posts[1]:
+            return
+        return self.insert(Comment, count, lambda i: Comment(
+            post_id=self.random.randint(*posts),
+            author_id=self.random.randint(*users),
+            text=self.text(3, 30), created=self.moment()))
+
+    def create_follows(self, per_user, users):
+        first, last = users
+        per_user = min(per_user, last - first)
+        if per_user <= 0:
+            return
+
+        def make(i):
+            user_id = first + i // per_user
+            author_id = self.random.randint(first, last - 1)
+            # без подписки на себя
+            if author_id >= user_id:
+                author_id += 1
+            return Follow(user_id=user_id, author_id=author_id,
+                          created=self.moment())
+        self.insert(Follow, (last - first + 1) * per_user, make)
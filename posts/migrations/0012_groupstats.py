@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('last_post_at', models.DateTimeField(blank=True, null=True)),
+                ('top_authors', models.TextField(default='[]')),
+                ('refreshed', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_paths(apps, schema_editor):
+    # до ответов все комментарии корневые: путь — время создания и id
+    from django.utils import timezone
+    Comment = apps.get_model("posts", "Comment")
+    batch = []
+    for comment in Comment.objects.only("pk", "created").iterator():
+        created = comment.created.astimezone(timezone.utc)
+        comment.path = f"{created:%Y%m%d%H%M%S%f}{comment.pk:010d}"
+        batch.append(comment)
+        if len(batch) >= 5000:
+            Comment.objects.bulk_update(batch, ["path"])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ["path"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
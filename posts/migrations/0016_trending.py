@@ -0,0 +1,58 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trending',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post')),
+                ('heat', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingGroup',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Group')),
+                ('heat', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_comment', models.PositiveIntegerField(default=0)),
+                ('last_follow', models.PositiveIntegerField(default=0)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('refreshed', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        # с auto_now_add схема заполнила бы старые подписки текущим
+        # временем, поэтому столбец добавляется без него: даты у них нет
+        migrations.AddField(
+            model_name='follow',
+            name='created',
+            field=models.DateTimeField(null=True, verbose_name='date followed'),
+        ),
+        migrations.AlterField(
+            model_name='follow',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, null=True, verbose_name='date followed'),
+        ),
+        migrations.AddIndex(
+            model_name='trendinggroup',
+            index=models.Index(fields=['-heat'], name='trending_group_heat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trending',
+            index=models.Index(fields=['-heat', '-post'], name='trending_heat_idx'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -13,12 +15,20 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что нужно карточке поста, за один запрос на страницу."""
+        return self.select_related("author", "group")
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(
         "date published",
         auto_now_add=True,
         db_index=True)
+    # время последней правки, по нему проверяется свежесть страницы поста
+    updated = models.DateTimeField("date updated", auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -36,13 +46,30 @@ class Post(models.Model):
         blank=True,
         null=True
     )
+    # адреса готовых миниатюр в JSON, заполняет posts.images
+    image_variants = models.TextField(blank=True, default="", editable=False)
+    # денормализованный счётчик, поддерживается posts.counters
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # под сортировку лент (-pub_date, -id) внутри группы и автора
+        indexes = [
+            models.Index(fields=["group", "-pub_date", "-id"],
+                         name="post_group_pub_date_idx"),
+            models.Index(fields=["author", "-pub_date", "-id"],
+                         name="post_author_pub_date_idx"),
+        ]
 
     def __str__(self):
         return self.text
 
+    @property
+    def variants(self):
+        return json.loads(self.image_variants) if self.image_variants else {}
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -51,12 +78,26 @@ class Comment(models.Model):
         User, on_delete=models.CASCADE, related_name="user")
     text = models.TextField()
     created = models.DateTimeField("date published", auto_now_add=True)
+    # ответ на другой комментарий того же поста
+    parent = models.ForeignKey(
+        "self", on_delete=models.CASCADE, null=True, blank=True,
+        related_name="replies")
+    # материализованный путь в дереве ответов, заполняет posts.comments
+    path = models.CharField(max_length=255, blank=True, default="",
+                            editable=False)
 
     def __str__(self):
         return self.text
 
     class Meta:
         ordering = ["created"]
+        indexes = [
+            models.Index(fields=["post", "created"],
+                         name="comment_post_created_idx"),
+            # страницы и ветки обсуждения — диапазоны по path
+            models.Index(fields=["post", "path"],
+                         name="comment_post_path_idx"),
+        ]
 
 
 class Follow(models.Model):
@@ -64,11 +105,162 @@ class Follow(models.Model):
         User, on_delete=models.CASCADE, related_name="follower")
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="following")
+    # у подписок, сделанных до появления поля, даты нет
+    created = models.DateTimeField(
+        "date followed", auto_now_add=True, null=True)
 
     class Meta:
+        # уникальность покрывает (user, author); обратный индекс нужен
+        # для выборки подписчиков автора без обращения к таблице
+        indexes = [
+            models.Index(fields=["author", "user"],
+                         name="follow_author_user_idx"),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'],
                 name='unique_together'
             )
         ]
+
+
+class FeedEntry(models.Model):
+    # материализованная лента подписок: строка на пару (читатель, пост)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="feed_entries")
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="feed_entries")
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=["user", "-pub_date", "-post"],
+                         name="feed_user_pub_date_idx"),
+            models.Index(fields=["user", "author"],
+                         name="feed_user_author_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"],
+                name="unique_feed_entry"
+            )
+        ]
+
+
+class UserStats(models.Model):
+    # денормализованные счётчики профиля, поддерживаются posts.counters
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name="stats")
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class GroupStats(models.Model):
+    # сводка для каталога групп, пересчитывается posts.group_stats
+    group = models.OneToOneField(
+        Group, on_delete=models.CASCADE, primary_key=True,
+        related_name="stats")
+    posts_count = models.PositiveIntegerField(default=0)
+    last_post_at = models.DateTimeField(null=True, blank=True)
+    # [{"username": ..., "posts": ...}, ...] в JSON
+    top_authors = models.TextField(default="[]")
+    refreshed = models.DateTimeField()
+
+    @property
+    def authors(self):
+        return json.loads(self.top_authors)
+
+
+class Trending(models.Model):
+    # пост с недавней активностью и его «горячесть», см. posts.trending
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE, primary_key=True,
+        related_name="trending")
+    heat = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-heat", "-post"],
+                         name="trending_heat_idx"),
+        ]
+
+
+class TrendingGroup(models.Model):
+    group = models.OneToOneField(
+        Group, on_delete=models.CASCADE, primary_key=True,
+        related_name="trending")
+    heat = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-heat"], name="trending_group_heat_idx"),
+        ]
+
+
+class TrendingState(models.Model):
+    # до каких комментариев и подписок активность уже учтена
+    last_comment = models.PositiveIntegerField(default=0)
+    last_follow = models.PositiveIntegerField(default=0)
+    # число строк Trending после пересчёта, для пагинации без COUNT
+    posts_count = models.PositiveIntegerField(default=0)
+    refreshed = models.DateTimeField(null=True, blank=True)
+
+
+class SearchTerm(models.Model):
+    # запись инвертированного индекса: основа слова -> пост, см. posts.search
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="search_terms")
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["term", "post"],
+                name="unique_search_term"
+            )
+        ]
+
+
+class Task(models.Model):
+    # отложенная задача очереди posts.tasks
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = [
+        (PENDING, "ждёт"),
+        (RUNNING, "выполняется"),
+        (DONE, "выполнена"),
+        (FAILED, "не удалась"),
+    ]
+
+    name = models.CharField(max_length=200)
+    # аргументы вызова в JSON
+    args = models.TextField(default="[]")
+    kwargs = models.TextField(default="{}")
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        # воркер выбирает самую раннюю готовую к запуску задачу
+        indexes = [
+            models.Index(fields=["status", "run_at", "id"],
+                         name="task_status_run_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,153 @@
+"""Фильтр запрещённых слов для постов и комментариев.
+
+Словарь — файл settings.MODERATION_WORDS_FILE, по слову в строке, после
+# — комментарий. Слово со звёздочкой на конце ("дурак*") — основа: под
+неё подходят все формы (дурака, дураки, дураков); без звёздочки слово
+ищется только целиком. Совпадение всегда начинается с начала слова,
+поэтому «трактир» не срабатывает на «тир».
+
+Все слова собираются в автомат Ахо — Корасик: текст проходится один раз,
+сколько бы слов ни было в словаре, вместо поиска каждого слова отдельно.
+Перед поиском и текст, и словарь нормализуются: регистр, ё -> е,
+латинские буквы, похожие на русские, -> русские, повторы букв
+схлопываются («дуууурак» -> «дурак»).
+
+Автомат строится один раз на процесс; раз в MODERATION_RELOAD_SECONDS
+проверяется время изменения файла, и изменённый словарь подхватывается
+без перезапуска.
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+LOOKALIKES = str.maketrans({
+    "ё": "е", "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "k": "к",
+    "m": "м", "o": "о", "p": "р", "t": "т", "x": "х", "y": "у",
+    "3": "з", "0": "о",
+})
+REPEATS = re.compile(r"(.)\1+")
+
+_lock = threading.Lock()
+_matcher = None
+_loaded = {"path": None, "mtime": None, "checked": 0.0}
+
+
+def normalize(text):
+    return REPEATS.sub(r"\1", text.lower().translate(LOOKALIKES))
+
+
+class Matcher:
+    """Автомат Ахо — Корасик по нормализованным словам словаря."""
+
+    def __init__(self, words):
+        # переходы, суффиксные ссылки и совпадения по состояниям;
+        # совпадение — (длина, только целое слово, слово из словаря)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for word in words:
+            self._add(word)
+        self._link()
+
+    def __len__(self):
+        return sum(len(out) for out in self.out)
+
+    def _add(self, word):
+        whole = not word.endswith("*")
+        key = normalize(word.rstrip("*"))
+        if not key:
+            return
+        state = 0
+        for char in key:
+            following = self.goto[state].get(char)
+            if following is None:
+                following = len(self.goto)
+                self.goto[state][char] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            state = following
+        self.out[state] += ((len(key), whole, word),)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self.goto[state].items():
+                queue.append(following)
+                link = self.fail[state]
+                while link and char not in self.goto[link]:
+                    link = self.fail[link]
+                self.fail[following] = self.goto[link].get(char, 0)
+                # совпадения по суффиксной ссылке тоже заканчиваются здесь
+                self.out[following] += self.out[self.fail[following]]
+
+    def finditer(self, text):
+        """Слова словаря в тексте по порядку вхождения."""
+        text = normalize(text)
+        goto, fail, out = self.goto, self.fail, self.out
+        end = len(text)
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not out[state]:
+                continue
+            for length, whole, word in out[state]:
+                start = position - length + 1
+                if start and text[start - 1].isalnum():
+                    continue
+                after = position + 1
+                if whole and after < end and text[after].isalnum():
+                    continue
+                yield word
+
+    def find(self, text):
+        """Первое найденное слово словаря или None."""
+        return next(self.finditer(text), None)
+
+
+def read_words(path):
+    words = []
+    with open(path, encoding="utf-8") as source:
+        for line in source:
+            word = line.split("#", 1)[0].strip()
+            if word:
+                words.append(word)
+    return words
+
+
+def _file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def matcher():
+    """Автомат текущего словаря; перечитывает изменившийся файл."""
+    global _matcher
+    now = time.monotonic()
+    path = settings.MODERATION_WORDS_FILE
+    if (_matcher is not None and path == _loaded["path"]
+            and now - _loaded["checked"] < settings.MODERATION_RELOAD_SECONDS):
+        return _matcher
+    with _lock:
+        mtime = _file_mtime(path)
+        if (_matcher is None or path != _loaded["path"]
+                or mtime != _loaded["mtime"]):
+            words = read_words(path) if mtime is not None else []
+            _matcher = Matcher(words)
+            _loaded.update(path=path, mtime=mtime)
+        _loaded["checked"] = now
+        return _matcher
+
+
+def check(text):
+    """Запрещённое слово из текста или None."""
+    return matcher().find(text)
@@ -0,0 +1,259 @@
+"""Постраничная навигация по лентам.
+
+Неглубокие страницы отдаются обычным ``Paginator`` с ``?page=N``, дальше
+навигация переключается на курсоры ``?after=``/``?before=`` по ключу
+(pub_date, id): такой запрос не делает ни COUNT, ни OFFSET, и его
+стоимость не зависит от глубины прокрутки. Номера страниц выше
+SHALLOW_PAGES не принимаются, а посты считаются только до конца
+последней такой страницы, так что и постраничный режим не проходит всю
+таблицу.
+"""
+import base64
+import binascii
+from contextlib import nullcontext
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from yatube import routers
+from yatube.metrics import record_cache
+
+from . import caching
+
+POSTS_PER_PAGE = 10
+# сколько первых страниц доступно по номеру
+SHALLOW_PAGES = 10
+PAGE_WINDOW = 4
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(pub_date, pk):
+    raw = f"{pub_date.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        value, pk = raw.rsplit("|", 1)
+        pub_date = parse_datetime(value)
+        pk = int(pk)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(token)
+    if pub_date is None:
+        raise InvalidCursor(token)
+    return pub_date, pk
+
+
+class CursorPage:
+    def __init__(self, object_list, has_next, has_previous, attr):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.attr = attr
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)} items>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def _cursor(self, obj):
+        return encode_cursor(getattr(obj, self.attr), obj.pk)
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self._cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self._cursor(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (field, id) в порядке убывания.
+
+    ``field`` — поле или аннотация для фильтрации и сортировки,
+    ``attr`` — атрибут объекта, из которого берётся значение ключа,
+    ``key`` — поле или аннотация с тем же значением, что и pk; нужна,
+    когда индекс, по которому идёт сортировка, хранит id в другой
+    таблице (как лента подписок).
+    """
+
+    def __init__(self, object_list, per_page, field="pub_date", attr=None,
+                 key="pk"):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.field = field
+        self.attr = attr or field.rsplit("__", 1)[-1]
+        self.key = key
+
+    def page(self, after=None, before=None):
+        field, key = self.field, self.key
+        if before:
+            pub_date, pk = decode_cursor(before)
+            queryset = self.object_list.filter(
+                Q(**{f"{field}__gt": pub_date})
+                | Q(**{field: pub_date, f"{key}__gt": pk})
+            ).order_by(field, key)
+            items = list(queryset[:self.per_page + 1])
+            has_previous = len(items) > self.per_page
+            items = items[:self.per_page][::-1]
+            return CursorPage(items, True, has_previous, self.attr)
+
+        queryset = self.object_list.order_by(f"-{field}", f"-{key}")
+        if after:
+            pub_date, pk = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(**{f"{field}__lt": pub_date})
+                | Q(**{field: pub_date, f"{key}__lt": pk})
+            )
+        items = list(queryset[:self.per_page + 1])
+        has_next = len(items) > self.per_page
+        return CursorPage(
+            items[:self.per_page], has_next, bool(after), self.attr)
+
+
+def _load(object_list, ids):
+    posts = object_list.in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def page_numbers(page, last=None):
+    """Номера страниц вокруг текущей, не дальше ``last``."""
+    last = min(page.paginator.num_pages, last or page.paginator.num_pages)
+    first = max(1, min(page.number, last) - PAGE_WINDOW)
+    return range(first, min(last, page.number + PAGE_WINDOW) + 1)
+
+
+def _reading(cache_key):
+    # под версию ленты кешируются только данные основной базы: отстающая
+    # реплика оставила бы в кеше старый список до следующей версии
+    return routers.primary() if cache_key else nullcontext()
+
+
+def _cursor_page(request, object_list, field, attr, key, feed):
+    after = request.GET.get("after")
+    before = request.GET.get("before")
+    paginator = CursorPaginator(
+        object_list, POSTS_PER_PAGE, field=field, attr=attr, key=key)
+    cache_key = caching.page_key(
+        feed, f"after:{after}" if after else f"before:{before}"
+    ) if feed else None
+    cached = cache.get(cache_key) if cache_key else None
+    if cache_key:
+        record_cache("page", int(cached is not None), int(cached is None))
+    if cached is None:
+        with _reading(cache_key):
+            try:
+                page = paginator.page(after=after, before=before)
+            except InvalidCursor:
+                page = paginator.page()
+        if cache_key:
+            cache.set(cache_key, {
+                "ids": [post.pk for post in page],
+                "has_next": page.has_next(),
+                "has_previous": page.has_previous(),
+            }, caching.TIMEOUT)
+    else:
+        page = CursorPage(
+            _load(object_list, cached["ids"]),
+            cached["has_next"], cached["has_previous"], attr)
+    return {
+        "page": page,
+        "paginator": paginator,
+        "page_numbers": [],
+        "next_cursor": page.next_cursor,
+        "previous_cursor": page.previous_cursor,
+    }
+
+
+def _page_number(value):
+    # глубже SHALLOW_PAGES по номеру не ходим: дальше только курсоры
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(number, SHALLOW_PAGES))
+
+
+def _number_page(request, object_list, field, attr, key, feed, count):
+    ordered = object_list.order_by(f"-{field}", f"-{key}")
+    paginator = Paginator(ordered, POSTS_PER_PAGE)
+    number = _page_number(request.GET.get("page"))
+    cache_key = caching.page_key(feed, f"page:{number}") if feed else None
+    cached = cache.get(cache_key) if cache_key else None
+    if cache_key:
+        record_cache("page", int(cached is not None), int(cached is None))
+    if cached is None:
+        with _reading(cache_key):
+            # лишний пост за последней страницей показывает, что дальше
+            # есть ещё: туда ведёт курсор
+            paginator.count = count() if count is not None else ordered[
+                :SHALLOW_PAGES * POSTS_PER_PAGE + 1].count()
+            page = paginator.get_page(number)
+            ids = [post.pk for post in page]
+        if cache_key:
+            cache.set(cache_key, {
+                "count": paginator.count,
+                "number": page.number,
+                "ids": ids,
+            }, caching.TIMEOUT)
+    else:
+        # count у Paginator — cached_property, берём значение из кеша
+        paginator.count = cached["count"]
+        page = Page(
+            _load(ordered, cached["ids"]), cached["number"], paginator)
+
+    next_cursor = None
+    if page.has_next() and page.number >= SHALLOW_PAGES:
+        last_item = page[len(page) - 1]
+        next_cursor = encode_cursor(getattr(last_item, attr), last_item.pk)
+    return {
+        "page": page,
+        "paginator": paginator,
+        "page_numbers": page_numbers(page, SHALLOW_PAGES),
+        "next_cursor": next_cursor,
+        "previous_cursor": None,
+    }
+
+
+def paginate(request, object_list, field="pub_date", attr=None, key="pk",
+             feed=None, count=None):
+    """Возвращает контекст навигации для шаблона paginator.html.
+
+    Если передано имя ленты ``feed``, список id постов на странице
+    кешируется до следующего изменения версии ленты (см. posts.caching).
+    ``count`` — функция, возвращающая число постов, если COUNT по
+    ``object_list`` дороже отдельного запроса.
+    """
+    attr = attr or field.rsplit("__", 1)[-1]
+    if request.GET.get("after") or request.GET.get("before"):
+        return _cursor_page(request, object_list, field, attr, key, feed)
+    return _number_page(
+        request, object_list, field, attr, key, feed, count)
@@ -0,0 +1,133 @@
+"""Ограничение частоты записей: скользящее окно в кеше.
+
+Правила из settings.RATE_LIMITS задаются по имени действия списком строк
+"область:число/период", например "user:10/m" — не больше десяти раз в
+минуту на пользователя, "ip:30/m" — на адрес. Анонимные запросы правила
+"user" считает по адресу. За обратным прокси адрес клиента читается из
+заголовка settings.RATE_LIMIT_IP_HEADER, иначе все делили бы адрес прокси.
+
+Для каждого правила в кеше лежат два счётчика: текущего и прошлого
+окна. Число запросов за последний период оценивается как текущий
+счётчик плюс доля прошлого, пропорциональная непрошедшей части окна, —
+так нет всплеска на границе окон, как у фиксированного окна. Проверка
+— один get_many на все правила, учёт — один атомарный incr на правило;
+отклонённый запрос не учитывается. При превышении ответ 429 с
+Retry-After: через сколько секунд оценка опустится ниже предела.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+SCOPES = ("user", "ip")
+
+_rules = {}
+
+
+def parse(rule):
+    """"user:10/m" -> ("user", 10, 60)."""
+    scope, _, rate = rule.partition(":")
+    count, _, period = rate.partition("/")
+    if scope not in SCOPES or period not in PERIODS:
+        raise ValueError(f"Неверное правило ограничения: {rule!r}")
+    return scope, int(count), PERIODS[period]
+
+
+def rules(name):
+    # правила разбираются один раз на процесс, пока настройка та же
+    config = settings.RATE_LIMITS.get(name, ())
+    cached = _rules.get(name)
+    if cached is None or cached[0] is not config:
+        cached = _rules[name] = (config, [parse(rule) for rule in config])
+    return cached[1]
+
+
+def client_ip(request):
+    header = settings.RATE_LIMIT_IP_HEADER
+    if header and request.META.get(header):
+        # клиент может дописать свои адреса слева, последний — от прокси
+        return request.META[header].rsplit(",", 1)[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _identity(request, scope):
+    if scope == "user" and request.user.is_authenticated:
+        return f"u{request.user.pk}"
+    return f"ip{client_ip(request)}"
+
+
+def _wait(limit, current, previous, elapsed, period):
+    """Секунды до момента, когда ещё один запрос уложится в предел."""
+    if current + 1 > limit:
+        # в этом окне уже не уложиться: ждём следующего, где текущий
+        # счётчик станет прошлым и будет убывать
+        wait, previous, current, elapsed = period - elapsed, current, 0, 0
+    else:
+        wait = 0
+    if previous:
+        # previous * (1 - t / period) + current + 1 <= limit
+        unlock = period * (1 - (limit - 1 - current) / previous)
+        wait += max(0, unlock - elapsed)
+    return wait
+
+
+def check(request, name):
+    """Учитывает запрос; возвращает None или секунды до Retry-After."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    limits = rules(name)
+    if not limits:
+        return None
+    cache = caches[settings.RATE_LIMIT_CACHE]
+    now = time.time()
+    counters = []
+    for scope, limit, period in limits:
+        window, offset = divmod(now, period)
+        window = int(window)
+        prefix = f"rl:{name}:{_identity(request, scope)}:{period}:"
+        counters.append((limit, period, offset,
+                         f"{prefix}{window}", f"{prefix}{window - 1}"))
+    found = cache.get_many(
+        [key for *_, current, previous in counters
+         for key in (current, previous)])
+
+    retry_after = None
+    for limit, period, offset, current, previous in counters:
+        count = found.get(current, 0)
+        before = found.get(previous, 0)
+        if before * (1 - offset / period) + count + 1 > limit:
+            retry_after = max(retry_after or 0, _wait(
+                limit, count, before, offset, period))
+    if retry_after is not None:
+        return max(1, math.ceil(retry_after))
+
+    for limit, period, offset, current, previous in counters:
+        # счётчик живёт два окна: текущее и следующее, где он прошлый
+        if current not in found and cache.add(current, 1, 2 * period):
+            continue
+        try:
+            cache.incr(current)
+        except ValueError:
+            cache.set(current, 1, 2 * period)
+    return None
+
+
+def limit(name, methods=("POST",)):
+    """Ограничивает частоту запросов методами methods (None — любыми)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = check(request, name)
+                if retry_after:
+                    response = render(request, "misc/429.html", {
+                        "retry_after": retry_after}, status=429)
+                    response["Retry-After"] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
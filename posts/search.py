@@ -0,0 +1,189 @@
+"""Полнотекстовый поиск по постам на инвертированном индексе.
+
+Текст поста разбивается на слова, слова приводятся к основе русским
+стеммером (алгоритм Snowball) и записываются в SearchTerm как пары
+(основа, пост) с частотой. Поиск ищет посты, содержащие все основы
+запроса, и ранжирует их по tf-idf. Индекс обновляется при сохранении
+поста, rebuild() пересобирает его целиком.
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from . import tasks
+from .models import Post, SearchTerm
+
+BATCH_SIZE = 1000
+MAX_TERM_LENGTH = 64
+# словарь постов невелик, поэтому основы слов стоит помнить
+STEM_CACHE_SIZE = 100000
+TOTAL_CACHE_TIMEOUT = 600
+
+WORD_RE = re.compile(r"\w+")
+
+STOP_WORDS = frozenset("""
+а без более бы был была были было быть в вам вас весь во вот все всего
+всех вы где да даже для до его ее ей ему если есть еще же за здесь и из
+или им их к как ко когда кто ли либо мне может мы на над надо наш не
+него нее нет ни них но ну о об однако он она они оно от очень по под при
+про с со так также такой там те тем то того тоже той только том ты у уже
+хотя чего чей чем что чтобы чье чья эта эти это я
+""".split())
+
+VOWELS = "аеиоуыэюя"
+PERFECTIVE_GERUND = re.compile(
+    r"(ив|ивши|ившись|ыв|ывши|ывшись|(?<=[ая])(в|вши|вшись))$")
+REFLEXIVE = re.compile(r"(ся|сь)$")
+ADJECTIVE = (r"(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|"
+             r"ому|их|ых|ую|юю|ая|яя|ою|ею)")
+PARTICIPLE = r"(ивш|ывш|ующ|(?<=[ая])(ем|нн|вш|ющ|щ))"
+ADJECTIVAL = re.compile(f"({PARTICIPLE}?{ADJECTIVE})$")
+VERB = re.compile(
+    r"(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|"
+    r"ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю|(?<=[ая])(ла|на|ете|йте|"
+    r"ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно))$")
+NOUN = re.compile(
+    r"(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|"
+    r"ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$")
+DERIVATIONAL = re.compile(r"ость?$")
+SUPERLATIVE = re.compile(r"ейше?$")
+
+
+def _region(word, start=0):
+    # позиция после первой согласной, идущей за гласной (R1/R2 Snowball)
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    """Основа русского слова по алгоритму Snowball."""
+    word = word.lower().replace("ё", "е")
+    rv_start = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS), None)
+    if rv_start is None:
+        return word
+    r2_start = _region(word, _region(word))
+    head, rv = word[:rv_start], word[rv_start:]
+
+    # шаг 1
+    match = PERFECTIVE_GERUND.search(rv)
+    if match:
+        rv = rv[:match.start()]
+    else:
+        rv = REFLEXIVE.sub("", rv)
+        for pattern in (ADJECTIVAL, VERB, NOUN):
+            match = pattern.search(rv)
+            if match:
+                rv = rv[:match.start()]
+                break
+    # шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+    # шаг 3: словообразовательный суффикс только внутри R2
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+    # шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        match = SUPERLATIVE.search(rv)
+        if match:
+            rv = rv[:match.start()]
+            if rv.endswith("нн"):
+                rv = rv[:-1]
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return head + rv
+
+
+def analyze(text):
+    """Частоты основ слов текста без стоп-слов."""
+    terms = Counter()
+    for word in WORD_RE.findall(text.lower().replace("ё", "е")):
+        if word in STOP_WORDS:
+            continue
+        terms[stem(word)[:MAX_TERM_LENGTH]] += 1
+    return terms
+
+
+def _postings(post_id, text):
+    return [SearchTerm(term=term, post_id=post_id, weight=weight)
+            for term, weight in analyze(text).items()]
+
+
+@transaction.atomic
+def index_post(post):
+    SearchTerm.objects.filter(post=post.pk).delete()
+    SearchTerm.objects.bulk_create(
+        _postings(post.pk, post.text))
+
+
+@tasks.task
+def reindex(post_id):
+    """Задача: индексирует текущий текст поста, если он ещё существует."""
+    for post in Post.objects.filter(pk=post_id).only("text").order_by()[:1]:
+        index_post(post)
+
+
+def _total_posts():
+    total = cache.get("search:total_posts")
+    if total is None:
+        total = Post.objects.count()
+        cache.set("search:total_posts", total, TOTAL_CACHE_TIMEOUT)
+    return total
+
+
+def search(query, queryset=None):
+    """Посты со всеми словами запроса, по убыванию tf-idf."""
+    queryset = Post.objects.all() if queryset is None else queryset
+    terms = list(analyze(query))
+    if not terms:
+        return queryset.none()
+    frequencies = dict(SearchTerm.objects.filter(term__in=terms).values(
+        "term").annotate(df=Count("post")).values_list("term", "df"))
+    if len(frequencies) < len(terms):
+        return queryset.none()
+    total = max(_total_posts(), 1)
+    rank = Sum(Case(
+        *[When(search_terms__term=term,
+               then=F("search_terms__weight") * math.log(1 + total / df))
+          for term, df in frequencies.items()],
+        output_field=FloatField()))
+    return queryset.filter(search_terms__term__in=terms).annotate(
+        rank=rank, matched=Count("search_terms")).filter(
+        matched=len(terms)).order_by("-rank", "-pub_date", "-pk")
+
+
+def _insert_rows(rows):
+    # executemany без создания объектов модели: в разы быстрее bulk_create
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO {} (term, post_id, weight) "
+            "VALUES (%s, %s, %s)".format(SearchTerm._meta.db_table), rows)
+
+
+def rebuild():
+    """Пересобирает индекс по всем постам."""
+    with transaction.atomic():
+        SearchTerm.objects.all().delete()
+        batch = []
+        posts = Post.objects.values_list("pk", "text")
+        for post_id, text in posts.iterator(chunk_size=BATCH_SIZE):
+            batch.extend((term, post_id, weight)
+                         for term, weight in analyze(text).items())
+            if len(batch) >= BATCH_SIZE:
+                _insert_rows(batch)
+                batch = []
+        if batch:
+            _insert_rows(batch)
+    cache.delete("search:total_posts")
+    return SearchTerm.objects.count()
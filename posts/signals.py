@@ -0,0 +1,115 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import caching, comments, counters, feed, search, tasks
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, update_fields=None, **kwargs):
+    # вход обновляет только last_login, имя при этом не читаем
+    instance._old_username = None
+    if instance.pk and (update_fields is None
+                        or "username" in update_fields):
+        instance._old_username = User.objects.filter(
+            pk=instance.pk).values_list("username", flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif getattr(instance, "_old_username", None) not in (
+            None, instance.username):
+        # имя автора выводится на карточках его постов и в ссылках лент
+        group_ids = Post.objects.filter(
+            author_id=instance.pk, group__isnull=False).order_by(
+            ).values_list("group_id", flat=True).distinct()
+        caching.bump(caching.author_name(instance.pk),
+                     caching.author_feed(instance.pk), caching.index_feed(),
+                     *(caching.group_feed(pk) for pk in group_ids))
+
+
+def _group_authors(group_id):
+    return list(Post.objects.filter(group_id=group_id).order_by(
+    ).values_list("author_id", flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # после удаления посты уже отвязаны от группы, авторов ищем заранее
+    instance._author_ids = _group_authors(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, created=False, **kwargs):
+    # новая или переименованная группа сразу видна в каталоге, на своей
+    # странице и на карточках своих постов
+    names = [caching.group_directory(), caching.group_feed(instance.pk),
+             caching.group_name(instance.pk)]
+    if not created:
+        # название группы выводится в <category> главной ленты и лент авторов
+        author_ids = getattr(instance, "_author_ids", None)
+        if author_ids is None:
+            author_ids = _group_authors(instance.pk)
+        names.append(caching.index_feed())
+        names.extend(caching.author_feed(pk) for pk in author_ids)
+    caching.bump(*names)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    # при смене группы пост нужно убрать и из ленты прежней группы
+    if instance.pk:
+        instance._old_group_id = Post.objects.filter(
+            pk=instance.pk).values_list("group_id", flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    # счётчики и версии кеша — по строке, их нужно видеть сразу; раскладка
+    # по лентам и индекс растут с аудиторией и текстом и уходят в очередь
+    if created:
+        tasks.enqueue(feed.fan_out_post, instance.pk)
+        counters.bump_user(instance.author_id, posts_count=1)
+    tasks.enqueue(search.reindex, instance.pk)
+    caching.invalidate_post(
+        instance, getattr(instance, "_old_group_id", None))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+    caching.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        comments.assign_path(instance)
+        counters.bump_comments(instance.post_id, 1)
+        caching.bump(caching.post_name(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    caching.bump(caching.post_name(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        tasks.enqueue(feed.follow_backfill, instance.user_id,
+                      instance.author_id)
+        counters.bump_user(instance.author_id, followers_count=1)
+        counters.bump_user(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    tasks.enqueue(feed.trim, instance.user_id, instance.author_id)
+    counters.bump_user(instance.author_id, followers_count=-1)
+    counters.bump_user(instance.user_id, following_count=-1)
@@ -0,0 +1,165 @@
+"""Ленты RSS 2.0, Atom 1.0 и JSON Feed 1.1 для главной, групп и авторов.
+
+Ответ собирается потоково: заголовок ленты, затем записи по мере
+рендеринга. FEED_SIZE строк читаются заранее и из основной базы: текст
+кешируется под версией ленты из posts.caching, и отстающая реплика
+оставила бы под ней старую ленту. Поскольку готовый текст в кеше, ETag
+известен без обращения к базе, а Last-Modified хранится рядом с
+текстом. Повторный запрос с If-None-Match/If-Modified-Since получает
+304 только по кешу; база читается, лишь когда лента изменилась.
+"""
+import json
+from itertools import chain
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from django.utils.text import Truncator
+
+from yatube import routers
+from yatube.metrics import record_cache
+
+from . import caching
+
+FEED_SIZE = 50
+TITLE_WORDS = 10
+CONTENT_TYPES = {
+    "rss": "application/rss+xml; charset=utf-8",
+    "atom": "application/atom+xml; charset=utf-8",
+    "json": "application/feed+json; charset=utf-8",
+}
+
+
+def _item(request, post):
+    link = request.build_absolute_uri(
+        reverse("post_view", args=[post.author.username, post.pk]))
+    return {
+        "id": link,
+        "link": link,
+        "title": Truncator(post.text).words(TITLE_WORDS),
+        "text": post.text,
+        "author": post.author.username,
+        "group": post.group.title if post.group else None,
+        "date": post.pub_date,
+    }
+
+
+def _rss(meta, items):
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<rss version="2.0"><channel>'
+           f'<title>{escape(meta["title"])}</title>'
+           f'<link>{escape(meta["link"])}</link>'
+           f'<description>{escape(meta["title"])}</description>')
+    for item in items:
+        category = (f'<category>{escape(item["group"])}</category>'
+                    if item["group"] else "")
+        yield ('<item>'
+               f'<title>{escape(item["title"])}</title>'
+               f'<link>{escape(item["link"])}</link>'
+               f'<guid isPermaLink="true">{escape(item["id"])}</guid>'
+               f'<description>{escape(item["text"])}</description>'
+               f'<pubDate>{format_datetime(item["date"])}</pubDate>'
+               f'{category}</item>')
+    yield '</channel></rss>\n'
+
+
+def _atom(meta, items):
+    updated = meta["updated"].isoformat() if meta["updated"] else ""
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<feed xmlns="http://www.w3.org/2005/Atom">'
+           f'<title>{escape(meta["title"])}</title>'
+           f'<link href={quoteattr(meta["link"])} rel="alternate"/>'
+           f'<id>{escape(meta["link"])}</id>'
+           f'<updated>{updated}</updated>')
+    for item in items:
+        category = (f'<category term={quoteattr(item["group"])}/>'
+                    if item["group"] else "")
+        yield ('<entry>'
+               f'<title>{escape(item["title"])}</title>'
+               f'<link href={quoteattr(item["link"])} rel="alternate"/>'
+               f'<id>{escape(item["id"])}</id>'
+               f'<updated>{item["date"].isoformat()}</updated>'
+               f'<author><name>{escape(item["author"])}</name></author>'
+               f'<content type="text">{escape(item["text"])}</content>'
+               f'{category}</entry>')
+    yield '</feed>\n'
+
+
+def _json(meta, items):
+    header = json.dumps({
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": meta["title"],
+        "home_page_url": meta["link"],
+    }, ensure_ascii=False)
+    # элементы дописываются в массив items по одному
+    yield header[:-1] + ', "items": ['
+    for number, item in enumerate(items):
+        entry = {
+            "id": item["id"],
+            "url": item["link"],
+            "title": item["title"],
+            "content_text": item["text"],
+            "date_published": item["date"].isoformat(),
+            "authors": [{"name": item["author"]}],
+        }
+        if item["group"]:
+            entry["tags"] = [item["group"]]
+        yield ("," if number else "") + json.dumps(entry, ensure_ascii=False)
+    yield "]}\n"
+
+
+RENDERERS = {"rss": _rss, "atom": _atom, "json": _json}
+
+
+def _stream(chunks, key, last_modified):
+    # кешируем, только если ответ отдан целиком
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    cache.set(key, {"body": "".join(body), "last_modified": last_modified},
+              caching.TIMEOUT)
+
+
+def response(request, fmt, feed, posts, title, link):
+    """Потоковый ответ с лентой posts в формате fmt.
+
+    ``feed`` — имя ленты в posts.caching, её версия входит в ETag.
+    """
+    if fmt not in RENDERERS:
+        raise Http404
+    key = caching.syndication_key(feed, caching.version(feed), fmt)
+    etag = quote_etag(key)
+    cached = cache.get(key)
+    record_cache("syndication", int(cached is not None), int(cached is None))
+    if cached is not None:
+        last_modified = cached["last_modified"]
+        chunks = [cached["body"]]
+    else:
+        with routers.primary():
+            posts = list(posts.for_feed().order_by(
+                "-pub_date", "-pk")[:FEED_SIZE])
+        items = (_item(request, post) for post in posts)
+        # первая запись нужна заранее: её дата — Last-Modified
+        first = next(items, None)
+        updated = first["date"] if first else None
+        last_modified = int(updated.timestamp()) if updated else None
+        meta = {"title": title, "link": request.build_absolute_uri(link),
+                "updated": updated}
+        if first:
+            items = chain([first], items)
+        chunks = _stream(RENDERERS[fmt](meta, items), key, last_modified)
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    result = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
+    result["ETag"] = etag
+    if last_modified:
+        result["Last-Modified"] = http_date(last_modified)
+    return result
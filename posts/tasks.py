@@ -0,0 +1,175 @@
+"""Очередь фоновых задач в базе данных, без внешнего брокера.
+
+Побочные эффекты записи — раскладка поста по лентам, заполнение ленты
+после подписки, поисковый индекс, миниатюры — регистрируются
+декоратором @task и ставятся в очередь через enqueue(). Задача — строка
+Task в той же транзакции, что и запись, поэтому воркер увидит её только
+после коммита, а откат отменит и её.
+
+Воркеры (manage.py run_tasks) забирают задачи условным UPDATE, так что
+одну задачу выполняет один воркер. Упавшая задача перезапускается с
+экспоненциальной задержкой, после TASKS_MAX_ATTEMPTS попыток остаётся в
+статусе failed с текстом ошибки. Задачи, зависшие у погибшего воркера,
+возвращаются в очередь через TASKS_STALE_SECONDS.
+
+С TASKS_EAGER (по умолчанию) задачи выполняются сразу при постановке,
+как и раньше — без воркеров.
+"""
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# имя задачи -> функция
+REGISTRY = {}
+
+
+def task(func):
+    """Регистрирует функцию как задачу очереди."""
+    func.task_name = f"{func.__module__}.{func.__name__}"
+    REGISTRY[func.task_name] = func
+    return func
+
+
+def resolve(name):
+    # воркер мог ещё не импортировать модуль с задачей
+    if name not in REGISTRY:
+        import_module(name.rsplit(".", 1)[0])
+    return REGISTRY[name]
+
+
+def enqueue(func, *args, delay=0, max_attempts=None, **kwargs):
+    """Ставит вызов func(*args, **kwargs) в очередь.
+
+    Аргументы должны сериализоваться в JSON. Возвращает Task или None,
+    если задача выполнена сразу (TASKS_EAGER).
+    """
+    if settings.TASKS_EAGER:
+        func(*args, **kwargs)
+        return None
+    return Task.objects.create(
+        name=func.task_name,
+        args=json.dumps(args),
+        kwargs=json.dumps(kwargs),
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker):
+    """Забирает самую раннюю готовую задачу; None, если их нет."""
+    while True:
+        now = timezone.now()
+        candidate = Task.objects.filter(
+            status=Task.PENDING, run_at__lte=now,
+        ).order_by("run_at", "id").values_list("pk", flat=True)[:1]
+        candidate = list(candidate)
+        if not candidate:
+            return None
+        # задачу мог забрать другой воркер между SELECT и UPDATE
+        claimed = Task.objects.filter(
+            pk=candidate[0], status=Task.PENDING,
+        ).update(status=Task.RUNNING, started=now, worker=worker,
+                 attempts=F("attempts") + 1)
+        if claimed:
+            return Task.objects.get(pk=candidate[0])
+
+
+def retry_delay(attempts):
+    """Задержка перед следующей попыткой: 10 с, 20 с, 40 с..."""
+    return settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def run(item):
+    """Выполняет забранную задачу и записывает результат."""
+    try:
+        func = resolve(item.name)
+        # частично выполненная задача не оставляет следов
+        with transaction.atomic():
+            func(*json.loads(item.args), **json.loads(item.kwargs))
+    except Exception:
+        logger.exception("Задача %s (%s) упала", item.pk, item.name)
+        item.error = traceback.format_exc()
+        if item.attempts >= item.max_attempts:
+            item.status = Task.FAILED
+            item.finished = timezone.now()
+        else:
+            item.status = Task.PENDING
+            item.run_at = timezone.now() + timedelta(
+                seconds=retry_delay(item.attempts))
+    else:
+        item.status = Task.DONE
+        item.finished = timezone.now()
+    item.save(update_fields=["status", "finished", "run_at", "error"])
+    return item
+
+
+def cleanup():
+    """Возвращает в очередь зависшие задачи и удаляет старые выполненные.
+
+    Возвращает (возвращено, удалено).
+    """
+    now = timezone.now()
+    requeued = Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=now - timedelta(seconds=settings.TASKS_STALE_SECONDS),
+    ).update(status=Task.PENDING, run_at=now, worker="")
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE,
+        finished__lt=now - timedelta(seconds=settings.TASKS_KEEP_SECONDS),
+    ).delete()
+    return requeued, deleted
+
+
+def work(worker=None, burst=False, poll=1.0, cleanup_every=60):
+    """Цикл воркера; с burst выходит, когда готовых задач не осталось.
+
+    Возвращает число выполненных задач.
+    """
+    worker = worker or worker_name()
+    done = 0
+    cleaned = None
+    while True:
+        if cleaned is None or time.monotonic() - cleaned >= cleanup_every:
+            cleanup()
+            cleaned = time.monotonic()
+        item = claim(worker)
+        if item is not None:
+            run(item)
+            done += 1
+            continue
+        if burst:
+            return done
+        time.sleep(poll)
+
+
+def stats():
+    """Число задач по статусам и возраст самой старой ждущей."""
+    result = {status: 0 for status, _ in Task.STATUSES}
+    rows = Task.objects.values("status").annotate(
+        count=Count("id"), oldest=Min("run_at")).order_by()
+    oldest = None
+    for row in rows:
+        result[row["status"]] = row["count"]
+        if row["status"] == Task.PENDING:
+            oldest = row["oldest"]
+    result["oldest_pending_seconds"] = max(
+        0.0, (timezone.now() - oldest).total_seconds()) if oldest else 0.0
+    return result
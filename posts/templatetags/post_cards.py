@@ -0,0 +1,64 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts import caching
+from posts.models import Post
+from yatube import routers
+from yatube.metrics import record_cache
+
+register = template.Library()
+
+CARD_TEMPLATE = "parts/post.html"
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Рендерит карточки постов, беря готовый HTML из кеша.
+
+    Ключ карточки включает версии поста, его группы и автора, поэтому
+    правка поста, новый комментарий или переименование группы либо
+    автора сразу дают промах и карточка перерисовывается.
+    """
+    posts = list(posts)
+    user = context.get("user")
+    user_id = user.pk if user is not None else None
+    names = {post.pk: (caching.post_name(post.pk),
+                       caching.group_name(post.group_id),
+                       caching.author_name(post.author_id))
+             for post in posts}
+    found = caching.versions({name for group in names.values()
+                              for name in group})
+    # по этим версиям conditional.etag соберёт ETag ленты
+    recorded = getattr(context.get("request"), "card_versions", None)
+    if recorded is not None:
+        recorded.update(found)
+    keys = {
+        post.pk: caching.card_key(
+            post.pk, *(found[name] for name in names[post.pk]),
+            user_id is not None and user_id == post.author_id)
+        for post in posts
+    }
+    cached = cache.get_many(keys.values())
+    record_cache("card", len(cached), len(keys) - len(cached))
+    card = get_template(CARD_TEMPLATE)
+    # карточка ложится в кеш под текущую версию поста, поэтому рисуется
+    # по данным основной базы, а не отстающей реплики
+    stale = [post.pk for post in posts if keys[post.pk] not in cached
+             and post._state.db != routers.PRIMARY]
+    fresh = Post.objects.using(routers.PRIMARY).for_feed().in_bulk(
+        stale) if stale else {}
+    rendered, missing = [], {}
+    for post in posts:
+        html = cached.get(keys[post.pk])
+        if html is None:
+            source = fresh.get(post.pk, post)
+            html = card.render({"post": source, "user": user})
+            # поста, которого уже нет в основной базе, в кеше не будет
+            if source._state.db == routers.PRIMARY:
+                missing[keys[post.pk]] = html
+        rendered.append(html)
+    if missing:
+        cache.set_many(missing, caching.TIMEOUT)
+    return mark_safe("".join(rendered))
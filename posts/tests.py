@@ -161,16 +161,21 @@ class BlogTests(TestCase):
         self.authorized_client.post(
             reverse('new_post'), {'text': 'Test text cached post.'})
         response = self.authorized_client.get(reverse('index'))
-        self.assertNotContains(
+        self.assertContains(
             response,
             'Test text cached post.',
-            msg_prefix="index page not cached")
-        cache.clear()
+            msg_prefix="new post not on index page - cache not invalidated")
+        post = Post.objects.get(text='Test text cached post.')
+        self.authorized_client.post(
+            reverse('post_edit',
+                    kwargs={'username': self.user.username,
+                            'post_id': post.id}),
+            {'text': 'Edited cached post.'})
         response = self.authorized_client.get(reverse('index'))
         self.assertContains(
             response,
-            'Test text cached post.',
-            msg_prefix="post not on index page - cache cleaned")
+            'Edited cached post.',
+            msg_prefix="edited post card not invalidated")
 
     def test_image_on_pages(self):
         post = Post.objects.create(text="Post with image",
@@ -0,0 +1,193 @@
+"""Популярное: посты и группы по недавней активности с затуханием.
+
+Каждое событие — комментарий к посту или подписка на автора (она
+засчитывается его последнему на тот момент посту) — даёт посту вклад
+weight * 2 ** (-(now - t) / HALF_LIFE). Сумма вкладов хранится не
+числом, а моментом «горячести» heat: временем, в которое одно свежее
+событие весило бы столько же,
+
+    heat = HALF_LIFE * log2(sum(weight * 2 ** (t / HALF_LIFE))).
+
+Затухание у всех постов общее, поэтому порядок по heat совпадает с
+порядком по текущему рейтингу в любой момент, и строки не нужно
+пересчитывать со временем: refresh() только добавляет новые события к
+heat затронутых постов и групп. Так периодический пересчёт стоит
+O(новых событий), а не O(постов).
+
+Строки, остывшие дольше WINDOW, удаляются, поэтому таблица хранит лишь
+посты с недавней активностью. Страница /trending/ читает её одним
+проходом по индексу (heat, post) с той же пагинацией и карточками, что
+и главная, а heat — обычная дата, так что подходят и курсоры ленты.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from yatube import routers
+from yatube.metrics import record_cache
+
+from . import caching, tasks
+from .models import (Comment, Follow, Group, Post, Trending, TrendingGroup,
+                     TrendingState)
+
+HALF_LIFE = timedelta(hours=12)
+# вес подписки относительно комментария
+COMMENT_WEIGHT = 1.0
+FOLLOW_WEIGHT = 3.0
+# сколько хранится пост, у которого больше нет активности
+WINDOW = timedelta(days=7)
+TOP_GROUPS = 5
+BATCH_SIZE = 1000
+
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _level(moment, weight=1.0):
+    """Момент как число полупериодов от EPOCH, с поправкой на вес."""
+    return (moment - EPOCH) / HALF_LIFE + math.log2(weight)
+
+
+def _moment(level):
+    return EPOCH + HALF_LIFE * level
+
+
+def _combine(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _add(levels, key, level):
+    old = levels.get(key)
+    levels[key] = level if old is None else _combine(old, level)
+
+
+def _comment_events(after):
+    rows = Comment.objects.filter(pk__gt=after).order_by("pk").values_list(
+        "pk", "post_id", "post__group_id", "created")
+    for pk, post_id, group_id, created in rows.iterator(
+            chunk_size=BATCH_SIZE):
+        yield pk, post_id, group_id, _level(created, COMMENT_WEIGHT)
+
+
+def _follow_events(after):
+    # последний пост автора к моменту подписки, по индексу автора
+    latest = Post.objects.filter(
+        author=OuterRef("author"), pub_date__lte=OuterRef("created"),
+    ).order_by("-pub_date", "-pk")
+    rows = Follow.objects.filter(pk__gt=after).order_by("pk").annotate(
+        post_id=Subquery(latest.values("pk")[:1]),
+        group_id=Subquery(latest.values("group_id")[:1]),
+    ).values_list("pk", "post_id", "group_id", "created")
+    for pk, post_id, group_id, created in rows.iterator(
+            chunk_size=BATCH_SIZE):
+        # у старых подписок даты нет: когда они сделаны, неизвестно, и
+        # засчитывать их нельзя, но курсор по ним всё равно сдвигается
+        level = _level(created, FOLLOW_WEIGHT) if created else None
+        yield pk, post_id, group_id, level
+
+
+def _merge(model, key, levels):
+    """Добавляет уровни к heat строк model; новые строки создаёт."""
+    keys = list(levels)
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = keys[start:start + BATCH_SIZE]
+        existing = model.objects.in_bulk(batch)
+        changed, created = [], []
+        for pk in batch:
+            level = levels[pk]
+            row = existing.get(pk)
+            if row is None:
+                created.append(model(**{key: pk, "heat": _moment(level)}))
+            else:
+                row.heat = _moment(_combine(_level(row.heat), level))
+                changed.append(row)
+        model.objects.bulk_update(changed, ["heat"])
+        model.objects.bulk_create(created, ignore_conflicts=True)
+
+
+@tasks.task
+def refresh():
+    """Учитывает новые комментарии и подписки; возвращает их число."""
+    now = timezone.now()
+    with transaction.atomic():
+        state, _ = TrendingState.objects.select_for_update().get_or_create(
+            pk=1)
+        posts, groups = {}, {}
+        # события старше окна уже остыли: их не записываем вовсе
+        cutoff = _level(now - WINDOW)
+        events = 0
+        last_comment = state.last_comment
+        for pk, post_id, group_id, level in _comment_events(last_comment):
+            last_comment = pk
+            events += 1
+            if level >= cutoff:
+                _add(posts, post_id, level)
+                if group_id:
+                    _add(groups, group_id, level)
+        last_follow = state.last_follow
+        for pk, post_id, group_id, level in _follow_events(last_follow):
+            last_follow = pk
+            events += 1
+            # у автора могло ещё не быть постов — засчитывать нечему
+            if post_id and level is not None and level >= cutoff:
+                _add(posts, post_id, level)
+                if group_id:
+                    _add(groups, group_id, level)
+
+        _merge(Trending, "post_id", posts)
+        _merge(TrendingGroup, "group_id", groups)
+        Trending.objects.filter(heat__lt=now - WINDOW).delete()
+        TrendingGroup.objects.filter(heat__lt=now - WINDOW).delete()
+
+        state.last_comment = last_comment
+        state.last_follow = last_follow
+        state.posts_count = Trending.objects.count()
+        state.refreshed = now
+        state.save()
+    caching.bump(caching.trending_feed())
+    return events
+
+
+@transaction.atomic
+def rebuild():
+    """Пересчитывает популярное с нуля по всей истории активности."""
+    Trending.objects.all().delete()
+    TrendingGroup.objects.all().delete()
+    TrendingState.objects.all().delete()
+    return refresh()
+
+
+def trending_posts():
+    # аннотации переиспользуют join из filter(), поэтому сортировка и
+    # курсор идут по индексу (-heat, -post) таблицы популярного
+    return Post.objects.filter(trending__heat__isnull=False).annotate(
+        heat=F("trending__heat"),
+        trending_post=F("trending__post"),
+    ).order_by("-heat", "-trending_post")
+
+
+def size():
+    """Число популярных постов на момент последнего пересчёта."""
+    return TrendingState.objects.filter(pk=1).values_list(
+        "posts_count", flat=True).first() or 0
+
+
+def top_groups():
+    """Самые активные группы, из кеша до следующего пересчёта."""
+    key = caching.trending_groups_key(
+        caching.version(caching.trending_feed()))
+    groups = cache.get(key)
+    record_cache("trending_groups", int(groups is not None),
+                 int(groups is None))
+    if groups is None:
+        with routers.primary():
+            groups = list(Group.objects.filter(
+                trending__heat__isnull=False).order_by(
+                "-trending__heat")[:TOP_GROUPS])
+        cache.set(key, groups, caching.TIMEOUT)
+    return groups
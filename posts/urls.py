@@ -4,8 +4,17 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name="index"),
+    path("trending/", views.trending_index, name="trending"),
+    path("groups/", views.group_index, name="group_index"),
     path("group/<slug:slug>/", views.group_posts, name="group_posts"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search_posts, name="search"),
+    path("feeds/index.<str:fmt>", views.index_syndication,
+         name="index_syndication"),
+    path("feeds/group/<slug:slug>.<str:fmt>", views.group_syndication,
+         name="group_syndication"),
+    path("feeds/author/<str:username>.<str:fmt>", views.profile_syndication,
+         name="profile_syndication"),
     path(
         "<str:username>/follow/",
         views.profile_follow,
@@ -20,4 +29,8 @@ urlpatterns = [
     path("<str:username>/", views.profile, name="profile"),
     path("<username>/<int:post_id>/comment/",
          views.add_comment, name="add_comment"),
+    path("<str:username>/<int:post_id>/comments/",
+         views.post_comments, name="post_comments"),
+    path("<str:username>/<int:post_id>/comments/<int:comment_id>/",
+         views.comment_thread, name="comment_thread"),
 ]
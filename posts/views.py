@@ -1,90 +1,167 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
+from django.utils.http import urlencode
+from . import (caching, comments, conditional, counters, feed, group_stats,
+               images, ratelimit, search, syndication, trending)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .paginator import POSTS_PER_PAGE, page_numbers, paginate
 
 
-@cache_page(20, key_prefix="index_page")
+@conditional.etag(conditional.index, cards=True)
 def index(request):
-    post_list = Post.objects.order_by('-pub_date').all()
-    paginator = Paginator(post_list, 10)
+    post_list = Post.objects.for_feed()
+    return render(request, 'index.html', paginate(
+        request, post_list, feed=caching.index_feed()))
 
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
-        request,
-        'index.html',
-        {'page': page, 'paginator': paginator}
-    )
 
+@conditional.etag(conditional.trending, cards=True)
+def trending_index(request):
+    context = paginate(
+        request, trending.trending_posts().for_feed(), field="heat",
+        key="trending_post", feed=caching.trending_feed(),
+        count=trending.size)
+    context["groups"] = trending.top_groups()
+    return render(request, "trending.html", context)
 
+
+@conditional.etag(conditional.group_posts, cards=True)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
 
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, "group.html", {
-        "group": group,
-        'page': page,
-        'paginator': paginator
+    post_list = group.posts.for_feed()
+    context = paginate(
+        request, post_list, feed=caching.group_feed(group.pk))
+    context["group"] = group
+    return render(request, "group.html", context)
+
+
+@conditional.etag(conditional.group_index)
+def group_index(request):
+    return render(request, "groups.html", {
+        "groups": group_stats.directory()})
+
+
+def index_syndication(request, fmt):
+    return syndication.response(
+        request, fmt, caching.index_feed(), Post.objects.all(),
+        "Yatube: последние записи", reverse("index"))
+
+
+def group_syndication(request, slug, fmt):
+    group = get_object_or_404(Group.objects.only("pk", "title"), slug=slug)
+    return syndication.response(
+        request, fmt, caching.group_feed(group.pk), group.posts.all(),
+        f"Yatube: {group.title}", reverse("group_posts", args=[slug]))
+
+
+def profile_syndication(request, username, fmt):
+    author = get_object_or_404(User.objects.only("pk"), username=username)
+    return syndication.response(
+        request, fmt, caching.author_feed(author.pk),
+        author.author_posts.all(), f"Yatube: {username}",
+        reverse("profile", args=[username]))
+
+
+@conditional.etag(conditional.search_posts, cards=True)
+def search_posts(request):
+    query = request.GET.get("q", "").strip()
+    post_list = search.search(query, Post.objects.for_feed())
+    paginator = Paginator(post_list, POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get("page"))
+    return render(request, "search.html", {
+        "query": query,
+        "page": page,
+        "paginator": paginator,
+        "page_numbers": page_numbers(page),
+        "page_query": urlencode({"q": query}) + "&",
     })
 
 
 @login_required
+@ratelimit.limit("new_post")
 def new_post(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
 
     if form.is_valid():
         instance = form.save(commit=False)
         instance.author = request.user
         instance.save()
+        images.schedule(instance)
 
         return redirect('index')
 
     return render(request, 'new.html', {'form': form})
 
 
+@conditional.etag(conditional.profile, cards=True)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     following = False
     if request.user.is_authenticated:
         following = Follow.objects.filter(user=request.user.id,
                                           author=author).exists()
-    post_list = author.author_posts.all()
-    count_posts = post_list.count()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-
-    return render(request, 'profile.html', {
+    post_list = author.author_posts.for_feed()
+    stats = counters.for_user(author)
+    context = paginate(
+        request, post_list, feed=caching.author_feed(author.pk))
+    context.update({
         "author": author,
-        'page': page,
-        'paginator': paginator,
-        'count_posts': count_posts,
+        'stats': stats,
+        'count_posts': stats.posts_count,
         'profile': author,
-        "following": following}
-    )
+        "following": following})
+
+    return render(request, 'profile.html', context)
 
 
+@conditional.etag(conditional.post_view)
 def post_view(request, username, post_id):
     author = get_object_or_404(User, username=username)
     post = get_object_or_404(Post, pk=post_id, author__username=username)
-    count_posts = author.author_posts.count()
+    stats = counters.for_user(author)
 
-    form = CommentForm(request.POST)
-    comments = post.comments.all()
+    form = CommentForm()
+    page, cursor = comments.page(post.pk)
 
     return render(request, "post_view.html", {
         "author": author,
         "username": username,
         "post": post,
-        "count_posts": count_posts,
+        "stats": stats,
+        "count_posts": stats.posts_count,
         "form": form,
-        "comments": comments, })
+        # ссылка «Ответить» передаёт комментарий в ?reply_to=
+        "reply_to": request.GET.get("reply_to", ""),
+        "comments": page,
+        "comments_cursor": cursor, })
+
+
+@conditional.etag(conditional.post_view)
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев для подгрузки на странице поста."""
+    post = get_object_or_404(
+        Post.objects.only("pk"), pk=post_id, author__username=username)
+    page, cursor = comments.page(post.pk, after=request.GET.get("after"))
+    return render(request, "parts/comments_page.html", {
+        "post": post,
+        "username": username,
+        "comments": page,
+        "comments_cursor": cursor})
+
+
+@conditional.etag(conditional.comment_thread)
+def comment_thread(request, username, post_id, comment_id):
+    """Комментарий со всеми ответами одним запросом."""
+    comment = get_object_or_404(
+        Comment, pk=comment_id, post=post_id, post__author__username=username)
+    return render(request, "comment_thread.html", {
+        "post": comment.post,
+        "username": username,
+        "comments": comments.thread(comment),
+        "comments_cursor": None})
 
 
 @login_required
@@ -98,7 +175,18 @@ def post_edit(request, username, post_id):
 
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
+            image_changed = 'image' in form.changed_data
+            post = form.save(commit=False)
+            # счётчик комментариев и миниатюры пишутся в обход формы:
+            # полное сохранение строки затёрло бы их прочитанными значениями
+            fields = ['text', 'group', 'image', 'updated']
+            if image_changed:
+                # старые миниатюры больше не подходят
+                post.image_variants = ''
+                fields.append('image_variants')
+            post.save(update_fields=fields)
+            if image_changed:
+                images.schedule(post)
             return redirect(
                 "post_view",
                 username=request.user.username,
@@ -126,36 +214,41 @@ def server_error(request):
 
 
 @login_required
+@ratelimit.limit("add_comment")
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, pk=post_id, author__username=username)
     form = CommentForm(request.POST or None)
+    reply_to = request.POST.get("parent", "")
+    try:
+        parent = comments.find_parent(post, reply_to)
+    except ValueError:
+        form.add_error(None, "Комментарий, на который вы отвечаете, удалён")
     if not form.is_valid():
-        return render(request, "comments.html",
-                      {"form": form, "post": post})
+        return render(request, "comments.html", {
+            "form": form, "post": post, "username": username,
+            "reply_to": reply_to})
     comment = form.save(commit=False)
     comment.author = request.user
     comment.post = post
+    comment.parent = parent
     form.save()
     return redirect("post_view", username, post_id)
 
 
 @login_required
+@conditional.etag(conditional.follow_index, cards=True)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = feed.feed_posts(request.user).for_feed()
     return render(
         request,
         'follow.html',
-        {
-            'page': page,
-            'paginator': paginator
-        }
+        paginate(request, post_list, field='feed_date', key='feed_post',
+                 count=lambda: feed.size(request.user))
     )
 
 
 @login_required
+@ratelimit.limit("follow", methods=None)
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -0,0 +1,122 @@
+import base64
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Group, Post
+
+from .test_images import jpeg_with_exif
+
+
+def basic(username, password):
+    raw = base64.b64encode(f'{username}:{password}'.encode()).decode()
+    return {'HTTP_AUTHORIZATION': f'Basic {raw}'}
+
+
+class TestApi:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_cursor_and_fields(self, client, user, group):
+        for number in range(25):
+            Post.objects.create(text=f'Пост {number}', author=user,
+                                group=group if number % 2 else None)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/posts/?limit=10&fields=id,author')
+        assert response.status_code == 200
+        assert len(queries) == 1, \
+            'Проверьте, что страница списка читается одним запросом'
+        data = response.json()
+        assert len(data['results']) == 10
+        assert data['results'][0] == {
+            'id': Post.objects.latest('pub_date', 'pk').pk,
+            'author': user.username,
+        }, 'Проверьте, что ?fields= ограничивает поля ответа'
+        assert 'text' not in queries[0]['sql'], \
+            'Проверьте, что ?fields= ограничивает и столбцы запроса'
+
+        seen = [item['id'] for item in data['results']]
+        while data['next']:
+            data = client.get(data['next']).json()
+            seen += [item['id'] for item in data['results']]
+        assert seen == list(Post.objects.order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True)), \
+            'Проверьте, что курсоры проходят все посты без пропусков'
+
+        data = client.get(f'/api/v1/posts/?group={group.slug}').json()
+        assert len(data['results']) == 12
+        assert all(item['group'] == group.slug for item in data['results'])
+
+        assert client.get('/api/v1/posts/?fields=secret').status_code == 400
+        assert client.get('/api/v1/posts/?after=bad').status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create(self, client, user, group):
+        user.set_password('secret')
+        user.save()
+        response = client.post('/api/v1/posts/', {'text': 'Новый пост'})
+        assert response.status_code == 401
+
+        response = client.post(
+            '/api/v1/posts/', {'text': 'Из API', 'group': group.slug},
+            content_type='application/json', **basic(user.username, 'secret'))
+        assert response.status_code == 201
+        post = Post.objects.get(pk=response.json()['id'])
+        assert post.author == user and post.group == group
+
+        response = client.post(
+            '/api/v1/posts/', {'text': ''}, content_type='application/json',
+            **basic(user.username, 'secret'))
+        assert response.status_code == 400
+        assert 'text' in response.json()['errors']
+
+        response = client.post(
+            f'/api/v1/posts/{post.pk}/comments/', {'text': 'Комментарий'},
+            content_type='application/json', **basic(user.username, 'secret'))
+        assert response.status_code == 201
+        assert Comment.objects.filter(post=post, author=user).exists()
+        data = client.get(f'/api/v1/posts/{post.pk}/comments/').json()
+        assert [item['text'] for item in data['results']] == ['Комментарий']
+
+        author = get_user_model().objects.create_user(username='Author')
+        response = client.post(
+            '/api/v1/follows/', {'author': author.username},
+            content_type='application/json', **basic(user.username, 'secret'))
+        assert response.status_code == 201
+        assert Follow.objects.filter(user=user, author=author).exists()
+        data = client.get('/api/v1/follows/',
+                          **basic(user.username, 'secret')).json()
+        assert [item['author'] for item in data['results']] == ['Author']
+
+        response = client.post(
+            '/api/v1/groups/', {'title': 'Новая', 'slug': 'new'},
+            content_type='application/json', **basic(user.username, 'secret'))
+        assert response.status_code == 403, \
+            'Проверьте, что группы создают только администраторы'
+        assert not Group.objects.filter(slug='new').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create_with_image(self, client, user, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.IMAGE_PIPELINE_EAGER = True
+        user.set_password('secret')
+        user.save()
+        response = client.post(
+            '/api/v1/posts/', {'text': 'С фото', 'image': jpeg_with_exif()},
+            **basic(user.username, 'secret'))
+        assert response.status_code == 201
+        post = Post.objects.get(pk=response.json()['id'])
+        assert 'card' in post.variants, \
+            'Проверьте, что картинка из API тоже уходит на обработку'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_session_requires_csrf(self, user):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(user)
+        response = client.post('/api/v1/posts/', {'text': 'Пост'})
+        assert response.status_code == 403, \
+            'Проверьте, что запись по сессии требует CSRF-токен'
+        assert not Post.objects.exists()
@@ -0,0 +1,49 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts.management.commands.bench_views import VIEWS
+from posts.models import Comment, FeedEntry, Follow, Post, SearchTerm
+
+
+class TestBenchmark:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_seed_data(self):
+        call_command('seed_data', users=10, groups=2, posts=50, follows=3,
+                     comments=40, batch_size=16, stdout=StringIO())
+
+        assert Post.objects.count() == 50
+        assert Comment.objects.count() == 40
+        assert Follow.objects.exists()
+        assert not Follow.objects.filter(
+            user=Post.objects.first().author,
+            author=Post.objects.first().author).exists(), \
+            'Проверьте, что пользователи не подписаны сами на себя'
+        assert Post.objects.dates('pub_date', 'day').count() > 1, \
+            'Проверьте, что даты постов распределены во времени'
+        assert FeedEntry.objects.exists() and SearchTerm.objects.exists(), \
+            'Проверьте, что после заполнения пересобираются ленты и индекс'
+        post = Post.objects.order_by('-comment_count').first()
+        assert post.comment_count == post.comments.count(), \
+            'Проверьте, что после заполнения пересчитываются счётчики'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bench_views_json(self, settings):
+        # замеры повторяют запросы записи и не должны упираться в лимиты
+        settings.RATE_LIMITS = {'new_post': ['user:1/h'],
+                                'add_comment': ['user:1/h']}
+        call_command('seed_data', users=5, groups=1, posts=20, follows=2,
+                     comments=10, stdout=StringIO())
+        out = StringIO()
+        call_command('bench_views', requests=2, warmup=0, json=True,
+                     stdout=out)
+
+        report = json.loads(out.getvalue())
+        assert set(report['views']) == set(VIEWS)
+        for name, stats in report['views'].items():
+            assert stats['status'] in (200, 302), name
+            assert stats['queries'] > 0
+            assert stats['p50_ms'] <= stats['p99_ms']
@@ -0,0 +1,98 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+
+from posts import bulk
+from posts.models import Comment, FeedEntry, Follow, Group, Post
+
+
+def make_data(user):
+    author = get_user_model().objects.create_user(username='BulkAuthor')
+    group = Group.objects.create(title='Группа', slug='bulk-group',
+                                 description='Описание')
+    post = Post.objects.create(
+        text='Старый пост', author=author, group=group,
+        image=SimpleUploadedFile('bulk.gif', b'GIF89a', 'image/gif'))
+    Post.objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() - timedelta(days=30))
+    Post.objects.create(text='Пост без группы', author=author)
+    Comment.objects.create(post=post, author=user, text='Комментарий')
+    Follow.objects.create(user=user, author=author)
+    return post
+
+
+class TestBulk:
+
+    @pytest.mark.parametrize('fmt', bulk.FORMATS)
+    @pytest.mark.django_db(transaction=True)
+    def test_export_import_round_trip(self, user, fmt, tmp_path, settings):
+        settings.MEDIA_ROOT = str(tmp_path / 'media')
+        post = make_data(user)
+        pub_date = Post.objects.get(pk=post.pk).pub_date
+        directory = str(tmp_path / 'dump')
+
+        call_command('export_data', directory, format=fmt, images=True,
+                     stdout=StringIO())
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+        settings.MEDIA_ROOT = str(tmp_path / 'new_media')
+        call_command('import_data', directory, format=fmt, images=True,
+                     stdout=StringIO())
+
+        restored = Post.objects.get(pk=post.pk)
+        assert restored.pub_date == pub_date, \
+            'Проверьте, что при импорте сохраняются даты публикации'
+        assert restored.group.slug == 'bulk-group'
+        assert restored.author.username == 'BulkAuthor'
+        assert restored.comments.get().author == user
+        assert restored.comment_count == 1, \
+            'Проверьте, что после импорта пересчитываются счётчики'
+        assert restored.image.storage.exists(restored.image.name), \
+            'Проверьте, что картинки переносятся вместе с постами'
+        assert Post.objects.count() == 2
+        assert Follow.objects.filter(user=user).exists()
+        assert FeedEntry.objects.filter(user=user).count() == 2, \
+            'Проверьте, что после импорта пересобираются ленты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_resumes(self, user, tmp_path):
+        make_data(user)
+        directory = str(tmp_path)
+        call_command('export_data', directory, models=['posts'],
+                     stdout=StringIO())
+        first, second = Post.objects.order_by('pk')
+        Post.objects.all().delete()
+        # первая строка уже загружена прошлым запуском
+        (tmp_path / bulk.PROGRESS_FILE).write_text(json.dumps({'posts': 1}))
+
+        call_command('import_data', directory, models=['posts'],
+                     stdout=StringIO())
+        assert list(Post.objects.values_list('pk', flat=True)) == [
+            second.pk], 'Проверьте, что импорт продолжается с места остановки'
+
+        call_command('import_data', directory, models=['posts'],
+                     restart=True, stdout=StringIO())
+        assert Post.objects.count() == 2, \
+            'Проверьте, что повторный импорт не дублирует записи'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_resumes(self, user, tmp_path):
+        make_data(user)
+        directory = str(tmp_path)
+        call_command('export_data', directory, models=['posts'],
+                     stdout=StringIO())
+        Post.objects.create(text='Новый пост', author=user)
+
+        call_command('export_data', directory, models=['posts'],
+                     resume=True, stdout=StringIO())
+        records = list(bulk.read_records(
+            bulk.data_path(directory, 'posts', 'jsonl'), 'jsonl'))
+        assert [record['text'] for record in records][-1] == 'Новый пост'
+        assert len(records) == 3
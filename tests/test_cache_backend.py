@@ -0,0 +1,78 @@
+import os
+import time
+
+import pytest
+
+from yatube.cache_backends import SQLiteCache
+
+
+@pytest.fixture
+def location(tmp_path):
+    return os.path.join(str(tmp_path), 'cache.sqlite3')
+
+
+def make_cache(location, **options):
+    return SQLiteCache(location, {'OPTIONS': options})
+
+
+class TestSQLiteCache:
+
+    def test_basic_operations(self, location):
+        cache = make_cache(location)
+        cache.set('key', {'value': 1})
+        assert cache.get('key') == {'value': 1}
+        assert cache.get('missing', 'default') == 'default'
+        assert not cache.add('key', 'other'), \
+            'Проверьте, что add не перезаписывает существующий ключ'
+        assert cache.add('new', 'value')
+        cache.set_many({'a': 1, 'b': 2})
+        assert cache.get_many(['a', 'b', 'c']) == {'a': 1, 'b': 2}
+        assert cache.incr('a') == 2
+        with pytest.raises(ValueError):
+            cache.incr('missing')
+        cache.delete('a')
+        assert 'a' not in cache
+        cache.clear()
+        assert cache.get('key') is None
+
+    def test_expiry(self, location):
+        cache = make_cache(location)
+        cache.set('key', 'value', timeout=0.05)
+        time.sleep(0.1)
+        assert cache.get('key') is None, \
+            'Проверьте, что просроченные записи не отдаются'
+        assert cache.add('key', 'new'), \
+            'Проверьте, что add работает поверх просроченной записи'
+
+    def test_shared_between_instances(self, location):
+        first = make_cache(location)
+        second = make_cache(location)
+        first.set('shared', 'value')
+        assert second.get('shared') == 'value', \
+            'Проверьте, что кеш общий для всех экземпляров на одном файле'
+
+    def test_lru_eviction(self, location):
+        cache = make_cache(location, MAX_ENTRIES=10, CULL_FREQUENCY=2,
+                           TOUCH_INTERVAL=0)
+        for i in range(10):
+            cache.set(f'key{i}', i)
+        time.sleep(0.01)
+        cache.get('key0')
+        cache._cull()
+        assert cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0] \
+            == 10
+        cache.set('key10', 10)
+        cache._cull()
+        assert cache.get('key0') == 0, \
+            'Проверьте, что недавно прочитанные ключи не вытесняются'
+        assert cache.get('key1') is None, \
+            'Проверьте, что вытесняются давно не использованные ключи'
+
+    def test_size_limit(self, location):
+        cache = make_cache(location, MAX_SIZE=10000)
+        for i in range(20):
+            cache.set(f'key{i}', 'x' * 1000)
+        cache._cull()
+        size = cache._db.execute('SELECT SUM(size) FROM cache').fetchone()[0]
+        assert size <= 10000, \
+            'Проверьте, что кеш не превышает MAX_SIZE'
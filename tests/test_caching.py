@@ -0,0 +1,67 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import caching
+from posts.models import Comment, Group, Post
+
+
+class TestFeedCaching:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cached_index_is_invalidated_on_write(self, client, user):
+        cache.clear()
+        group = Group.objects.create(title='Группа', slug='cached')
+        post = Post.objects.create(text='Первый пост', author=user,
+                                   group=group)
+        client.get('/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/')
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        assert 'COUNT' not in sql, \
+            'Проверьте, что список постов страницы берётся из кеша'
+
+        Post.objects.create(text='Новый пост', author=user)
+        response = client.get('/')
+        assert 'Новый пост' in response.content.decode(), \
+            'Проверьте, что новый пост сразу виден на главной странице'
+
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        response = client.get('/')
+        assert 'Комментариев: 1' in response.content.decode(), \
+            'Проверьте, что карточка перерисовывается после комментария'
+
+        other = Group.objects.create(title='Другая', slug='other')
+        post.group = other
+        post.save()
+        response = client.get(f'/group/{group.slug}/')
+        assert len(response.context['page']) == 0, \
+            'Проверьте, что пост пропадает из ленты прежней группы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cards_follow_renames(self, client, user):
+        cache.clear()
+        group = Group.objects.create(title='Старая группа', slug='renamed')
+        Post.objects.create(text='Пост', author=user, group=group)
+        response = client.get('/')
+        assert 'Старая группа' in response.content.decode()
+        etag = response['ETag']
+
+        group.title = 'Новая группа'
+        group.save()
+        response = client.get('/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что переименование группы меняет ETag ленты'
+        assert 'Новая группа' in response.content.decode(), \
+            'Проверьте, что карточка перерисовывается после переименования'
+
+        user.username = 'Renamed'
+        user.save()
+        assert '@Renamed' in client.get('/').content.decode(), \
+            'Проверьте, что карточка перерисовывается после смены имени'
+
+        before = caching.version(caching.author_name(user.pk))
+        client.force_login(user)
+        assert caching.version(caching.author_name(user.pk)) == before, \
+            'Проверьте, что вход пользователя не сбрасывает карточки'
@@ -0,0 +1,81 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import comments
+from posts.models import Comment
+
+
+class TestCommentThreads:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_follow_discussion_order(self, user, post, monkeypatch):
+        monkeypatch.setattr(comments, 'PER_PAGE', 3)
+        first = Comment.objects.create(post=post, author=user, text='1')
+        second = Comment.objects.create(post=post, author=user, text='2')
+        reply = Comment.objects.create(post=post, author=user, text='1.1',
+                                       parent=first)
+        nested = Comment.objects.create(post=post, author=user, text='1.1.1',
+                                        parent=reply)
+        Comment.objects.create(post=post, author=user, text='3')
+
+        page, cursor = comments.page(post.pk, per_page=3)
+        assert [(c.text, c.depth) for c in page] == [
+            ('1', 0), ('1.1', 1), ('1.1.1', 2)], \
+            'Проверьте, что ответы идут сразу под своим комментарием'
+        page, cursor = comments.page(post.pk, after=cursor, per_page=3)
+        assert [c.text for c in page] == ['2', '3']
+        assert cursor is None
+
+        with CaptureQueriesContext(connection) as queries:
+            thread = list(comments.thread(Comment.objects.get(pk=first.pk)))
+        assert [c.pk for c in thread] == [first.pk, reply.pk, nested.pk]
+        assert len(queries) == 2
+        assert second not in thread
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_paths(self, user, post):
+        root = Comment.objects.create(post=post, author=user, text='1')
+        reply = Comment.objects.create(post=post, author=user, text='1.1',
+                                       parent=root)
+        expected = Comment.objects.get(pk=reply.pk).path
+        Comment.objects.update(path='')
+        comments.rebuild_paths()
+        assert Comment.objects.get(pk=reply.pk).path == expected
+        assert expected.startswith(Comment.objects.get(pk=root.pk).path + '.')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views(self, user_client, user, post, monkeypatch):
+        monkeypatch.setattr(comments, 'PER_PAGE', 2)
+        for number in range(3):
+            Comment.objects.create(post=post, author=user,
+                                   text=f'Коммент {number}')
+        url = f'/{user.username}/{post.pk}/'
+        response = user_client.get(url)
+        assert len(response.context['comments']) == 2
+        cursor = response.context['comments_cursor']
+        assert cursor, \
+            'Проверьте, что на странице поста есть ссылка на продолжение'
+
+        response = user_client.get(f'{url}comments/', {'after': cursor})
+        assert response.status_code == 200
+        assert 'Коммент 2' in response.content.decode()
+        assert 'Коммент 0' not in response.content.decode()
+
+        root = Comment.objects.order_by('pk').first()
+        response = user_client.post(f'{url}comment/',
+                                    {'text': 'Ответ', 'parent': root.pk})
+        assert response.status_code == 302
+        reply = Comment.objects.get(text='Ответ')
+        assert reply.parent == root
+
+        response = user_client.get(f'{url}comments/{root.pk}/')
+        assert [c.text for c in response.context['comments']] == [
+            'Коммент 0', 'Ответ']
+        assert 'base.html' in [t.name for t in response.templates], \
+            'Проверьте, что ветка открывается целой страницей сайта'
+
+        response = user_client.post(f'{url}comment/',
+                                    {'text': 'Ответ', 'parent': 999})
+        assert response.status_code == 200, \
+            'Проверьте, что нельзя ответить на несуществующий комментарий'
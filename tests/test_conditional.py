@@ -0,0 +1,99 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+
+from posts.models import Comment, Follow, Post
+
+
+def revalidate(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+
+class TestConditionalGet:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_read_views_return_not_modified(self, user_client, user, group):
+        post = Post.objects.create(text='Пост', author=user, group=group)
+        urls = ['/', f'/group/{group.slug}/', f'/{user.username}/',
+                f'/{user.username}/{post.pk}/', '/follow/', '/groups/',
+                '/search/?q=пост']
+        for url in urls:
+            response = revalidate(user_client, url)
+            assert response.status_code == 304, \
+                f'Проверьте, что {url} отвечает 304 при совпадении ETag'
+            assert not response.content
+        assert user_client.get(
+            '/group/missing/', HTTP_IF_NONE_MATCH='"x"').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_etag_follows_data(self, user_client, user, group):
+        post = Post.objects.create(text='Пост', author=user, group=group)
+        url = f'/{user.username}/{post.pk}/'
+        etag = user_client.get(url)['ETag']
+
+        listings = ['/', f'/group/{group.slug}/', f'/{user.username}/',
+                    '/search/?q=пост']
+        listing_etags = {page: user_client.get(page)['ETag']
+                         for page in listings}
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что новый комментарий меняет ETag поста'
+        etag = response['ETag']
+        for page, listing_etag in listing_etags.items():
+            response = user_client.get(page, HTTP_IF_NONE_MATCH=listing_etag)
+            assert response.status_code == 200, \
+                'Проверьте, что комментарий меняет ETag лент со счётчиком'
+
+        post.text = 'Исправленный пост'
+        post.save()
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что правка поста меняет ETag'
+        assert post.updated > post.pub_date
+
+        etag = user_client.get(f'/group/{group.slug}/')['ETag']
+        Post.objects.create(text='Ещё пост', author=user, group=group)
+        response = user_client.get(
+            f'/group/{group.slug}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что новый пост меняет ETag группы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_listing_etag_ignores_other_cards(self, user_client, user,
+                                              group):
+        author = get_user_model().objects.create_user(username='Author')
+        Post.objects.create(text='Пост', author=user, group=group)
+        other = Post.objects.create(text='Чужой пост', author=author)
+        pages = [f'/group/{group.slug}/', f'/{user.username}/']
+        etags = {page: user_client.get(page)['ETag'] for page in pages}
+
+        Comment.objects.create(post=other, author=user, text='Комментарий')
+        for page, etag in etags.items():
+            response = user_client.get(page, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304, \
+                'Проверьте, что комментарий к посту не с этой страницы ' \
+                'не меняет её ETag'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_etag_depends_on_viewer(self, user_client, user):
+        author = get_user_model().objects.create_user(username='Author')
+        url = f'/{author.username}/'
+        etag = user_client.get(url)['ETag']
+        assert Client().get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 200, \
+            'Проверьте, что ETag страницы зависит от пользователя'
+
+        Follow.objects.create(user=user, author=author)
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что подписка меняет ETag профиля'
+        assert 'private' in response['Cache-Control']
@@ -0,0 +1,81 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.db.models.signals import pre_save
+
+from posts.models import Comment, Follow, Post, UserStats
+
+
+class TestCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_follow_writes(self, user_client, user):
+        author = get_user_model().objects.create_user(username='CountAuthor')
+        response = user_client.get(f'/{author.username}/')
+        assert response.context['stats'].posts_count == 0
+
+        post = Post.objects.create(text='Пост', author=author)
+        Post.objects.create(text='Ещё пост', author=author)
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        user_client.get(f'/{author.username}/follow/')
+
+        stats = UserStats.objects.get(user=author)
+        assert stats.posts_count == 2, \
+            'Проверьте, что счётчик постов растёт при создании поста'
+        assert stats.followers_count == 1, \
+            'Проверьте, что счётчик подписчиков растёт при подписке'
+        assert UserStats.objects.get(user=user).following_count == 1, \
+            'Проверьте, что счётчик подписок растёт при подписке'
+        post.refresh_from_db()
+        assert post.comment_count == 1, \
+            'Проверьте, что счётчик комментариев растёт при комментировании'
+
+        user_client.get(f'/{author.username}/unfollow/')
+        post.comments.all().delete()
+        post.delete()
+        stats.refresh_from_db()
+        assert (stats.posts_count, stats.followers_count) == (1, 0), \
+            'Проверьте, что счётчики уменьшаются при удалении'
+
+        response = user_client.get(f'/{author.username}/')
+        assert response.context['count_posts'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_keeps_comment_count(self, user_client, user):
+        post = Post.objects.create(text='Пост', author=user)
+        Comment.objects.create(post=post, author=user, text='Коммент')
+
+        def comment_meanwhile(sender, instance, **kwargs):
+            # комментарий приходит, пока правка поста ещё не сохранена
+            Post.objects.filter(pk=instance.pk).update(
+                comment_count=F('comment_count') + 1)
+
+        pre_save.connect(comment_meanwhile, sender=Post)
+        try:
+            user_client.post(f'/{user.username}/{post.pk}/edit/',
+                             {'text': 'Правка'})
+        finally:
+            pre_save.disconnect(comment_meanwhile, sender=Post)
+        post.refresh_from_db()
+        assert post.text == 'Правка'
+        assert post.comment_count == 2, \
+            'Проверьте, что правка поста не затирает счётчик комментариев'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recount_counters_command(self, user):
+        author = get_user_model().objects.create_user(username='CountAuthor')
+        post = Post.objects.create(text='Пост', author=author)
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        Follow.objects.create(user=user, author=author)
+        UserStats.objects.all().delete()
+        Post.objects.update(comment_count=0)
+
+        call_command('recount_counters')
+        stats = UserStats.objects.get(user=author)
+        assert (stats.posts_count, stats.followers_count) == (1, 1), \
+            'Проверьте, что recount_counters пересчитывает счётчики профиля'
+        assert UserStats.objects.get(user=user).following_count == 1
+        post.refresh_from_db()
+        assert post.comment_count == 1, \
+            'Проверьте, что recount_counters пересчитывает комментарии'
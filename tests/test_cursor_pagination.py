@@ -0,0 +1,100 @@
+import pytest
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Post
+from posts.paginator import (POSTS_PER_PAGE, SHALLOW_PAGES, CursorPage,
+                             decode_cursor, encode_cursor)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # списки id на страницах кешируются, изолируем тест от соседних
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def walk(client, url, key='after', token=None):
+    seen = []
+    while True:
+        response = client.get(url, {key: token} if token else {})
+        page = response.context['page']
+        seen.extend(post.pk for post in page)
+        token = response.context['next_cursor']
+        if not token:
+            return seen
+
+
+class TestCursorPagination:
+
+    def test_cursor_roundtrip(self):
+        from django.utils import timezone
+        now = timezone.now()
+        assert decode_cursor(encode_cursor(now, 42)) == (now, 42)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_cursor_walk(self, client, user):
+        posts = [Post.objects.create(text=f'Пост {i}', author=user)
+                 for i in range(25)]
+        expected = [post.pk for post in reversed(posts)]
+
+        first = client.get('/')
+        assert type(first.context['page']) == Page, \
+            'Проверьте, что первая страница отдаётся в постраничном режиме'
+
+        last = first.context['page'][-1]
+        token = encode_cursor(last.pub_date, last.pk)
+        response = client.get('/', {'after': token})
+        page = response.context['page']
+        assert type(page) == CursorPage, \
+            'Проверьте, что `?after=` включает курсорную навигацию'
+        assert [post.pk for post in page] == expected[10:20]
+
+        assert walk(client, '/', token=response.context['next_cursor']) == \
+            expected[20:], \
+            'Проверьте, что курсоры проходят все посты без повторов'
+
+        response = client.get('/', {'before': page.previous_cursor})
+        assert [post.pk for post in response.context['page']] == \
+            expected[:10], 'Проверьте навигацию назад через `?before=`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_cursor(self, client, post):
+        response = client.get('/', {'after': 'not-a-cursor'})
+        assert response.status_code == 200
+        assert len(response.context['page']) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_cursor_walk(self, user_client, user):
+        from django.contrib.auth import get_user_model
+        author = get_user_model().objects.create_user(username='CursorAuthor')
+        user_client.get(f'/{author.username}/follow/')
+        posts = [Post.objects.create(text=f'Пост {i}', author=author)
+                 for i in range(15)]
+        expected = [post.pk for post in reversed(posts)]
+
+        first = user_client.get('/follow/').context['page']
+        token = encode_cursor(first[-1].pub_date, first[-1].pk)
+        assert walk(user_client, '/follow/', token=token) == expected[10:], \
+            'Проверьте курсорную навигацию по ленте подписок'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_numbers_bounded(self, client, user):
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=user)
+            for i in range(SHALLOW_PAGES * POSTS_PER_PAGE + 5))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/', {'page': 400})
+        page = response.context['page']
+        assert page.number == SHALLOW_PAGES, \
+            'Проверьте, что номер страницы ограничен SHALLOW_PAGES'
+        assert response.context['next_cursor'], \
+            'Проверьте, что с последней страницы по номеру ведёт курсор'
+        counts = [query['sql'] for query in queries.captured_queries
+                  if 'COUNT(' in query['sql']]
+        assert counts and all('LIMIT' in sql for sql in counts), \
+            'Проверьте, что посты считаются только до последней страницы'
@@ -0,0 +1,39 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import connection
+
+
+class TestDatabase:
+
+    @pytest.mark.django_db
+    def test_sqlite_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            assert cursor.fetchone()[0] == 1, \
+                'Проверьте, что соединения с SQLite открываются с ' \
+                'synchronous=NORMAL'
+            cursor.execute('PRAGMA cache_size')
+            assert cursor.fetchone()[0] == -64 * 1024
+
+    @pytest.mark.django_db
+    def test_broken_connection_closed(self, monkeypatch):
+        connection.ensure_connection()
+        closed = []
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        monkeypatch.setattr(connection, 'close', lambda: closed.append(1))
+
+        request_started.send(sender=None)
+        assert closed, \
+            'Проверьте, что перед запросом закрываются оборванные соединения'
+
+    def test_bench_db(self):
+        out = StringIO()
+        call_command('bench_db', seconds=0.2, rows=100, readers=1,
+                     writers=1, json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        assert set(results) == {'default', 'tuned'}
+        assert results['tuned']['reads_per_s'] > 0
@@ -0,0 +1,42 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from posts.models import FeedEntry, Follow, Post
+
+
+class TestFeed:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_fan_out_and_trim(self, user_client, user):
+        author = get_user_model().objects.create_user(username='FeedAuthor')
+        Post.objects.create(text='Пост до подписки', author=author)
+
+        user_client.get(f'/{author.username}/follow/')
+        assert FeedEntry.objects.filter(user=user).count() == 1, \
+            'Проверьте, что при подписке лента заполняется постами автора'
+
+        Post.objects.create(text='Пост после подписки', author=author)
+        assert FeedEntry.objects.filter(user=user).count() == 2, \
+            'Проверьте, что новый пост попадает в ленты подписчиков'
+
+        response = user_client.get('/follow/')
+        assert len(response.context['page']) == 2
+        assert response.context['page'][0].text == 'Пост после подписки', \
+            'Проверьте, что лента подписок отсортирована по дате публикации'
+
+        user_client.get(f'/{author.username}/unfollow/')
+        assert not FeedEntry.objects.filter(user=user).exists(), \
+            'Проверьте, что при отписке посты автора убираются из ленты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_feeds_command(self, user):
+        author = get_user_model().objects.create_user(username='FeedAuthor')
+        Follow.objects.create(user=user, author=author)
+        Post.objects.create(text='Пост 1', author=author)
+        Post.objects.create(text='Пост 2', author=author)
+        FeedEntry.objects.all().delete()
+
+        call_command('rebuild_feeds')
+        assert FeedEntry.objects.filter(user=user).count() == 2, \
+            'Проверьте, что команда rebuild_feeds пересобирает ленты'
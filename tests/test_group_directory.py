@@ -0,0 +1,52 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Group, GroupStats, Post
+
+
+class TestGroupDirectory:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_refresh_group_stats(self, user, group):
+        other = get_user_model().objects.create_user(username='Other')
+        empty = Group.objects.create(title='Пустая', slug='empty',
+                                     description='Без постов')
+        Post.objects.create(text='Пост 1', author=user, group=group)
+        Post.objects.create(text='Пост 2', author=user, group=group)
+        last = Post.objects.create(text='Пост 3', author=other, group=group)
+        Post.objects.create(text='Вне групп', author=other)
+
+        call_command('refresh_group_stats')
+
+        stats = GroupStats.objects.get(group=group)
+        assert stats.posts_count == 3
+        assert stats.last_post_at == last.pub_date
+        assert stats.authors == [
+            {'username': user.username, 'posts': 2},
+            {'username': other.username, 'posts': 1},
+        ], 'Проверьте, что авторы упорядочены по числу постов'
+        assert GroupStats.objects.get(group=empty).posts_count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_index_view(self, client, user, group):
+        Post.objects.create(text='Пост', author=user, group=group)
+        call_command('refresh_group_stats')
+        Group.objects.create(title='Новая группа', slug='new',
+                             description='Ещё не пересчитана')
+
+        response = client.get('/groups/')
+        assert response.status_code == 200
+        groups = response.context['groups']
+        assert [g.slug for g in groups] == [group.slug, 'new'], \
+            'Проверьте, что группы упорядочены по числу постов, а новые ' \
+            'группы видны до пересчёта'
+        content = response.content.decode()
+        assert f'@{user.username}' in content
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/groups/')
+        assert not any('posts_post' in query['sql'] for query in queries), \
+            'Проверьте, что каталог читает сводку, а не таблицу постов'
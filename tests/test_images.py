@@ -0,0 +1,134 @@
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+from posts import images, tasks
+from posts.models import Post, Task
+
+
+def jpeg_with_exif():
+    image = Image.new('RGB', (1200, 800), 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'TestCamera'
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile(
+        'photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class TestImagePipeline:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_post_image_processed(self, user_client, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.IMAGE_PIPELINE_EAGER = True
+        before = images.stats()
+
+        user_client.post('/new/', {'text': 'Пост с фото',
+                                   'image': jpeg_with_exif()})
+        post = Post.objects.get(text='Пост с фото')
+
+        assert 'card' in post.variants, \
+            'Проверьте, что после сохранения поста готовятся миниатюры'
+        card = post.variants['card']
+        assert card['width'] == 960
+        assert card['srcset']['webp'].count('.webp') == len(
+            images.CARD_WIDTHS), \
+            'Проверьте, что готовятся WebP-варианты всех ширин'
+        assert ' 480w' in card['srcset']['jpeg']
+        with post.image.open('rb') as file:
+            assert not Image.open(file).getexif(), \
+                'Проверьте, что из оригинала удаляются метаданные'
+
+        after = images.stats()
+        assert after['processed'] == before['processed'] + 1
+        assert after['queue_depth'] == 0
+
+        response = user_client.get('/')
+        content = response.content.decode()
+        assert card['url'] in content, \
+            'Проверьте, что карточка использует готовую миниатюру'
+        assert card['srcset']['webp'] in content, \
+            'Проверьте, что в карточке есть srcset с WebP'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_broken_image_task_retried(self, user, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.TASKS_EAGER = False
+        post = Post.objects.create(
+            text='Битая картинка', author=user,
+            image=SimpleUploadedFile('broken.jpg', b'not an image'))
+        Task.objects.all().delete()
+        before = images.stats()
+
+        images.schedule(post)
+        assert tasks.work(burst=True) == 1
+        task = Task.objects.get(name=images.process.task_name)
+        assert task.status in (Task.PENDING, Task.FAILED), \
+            'Проверьте, что сбой обработки картинки не считается выполненным'
+        assert task.error
+        assert images.stats()['failed'] == before['failed'] + 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stripped_copy_swapped_in(self, user, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        post = Post.objects.create(text='Фото', author=user,
+                                   image=jpeg_with_exif())
+        original = post.image.name
+        images.process(post.pk)
+        post.refresh_from_db()
+        assert images.is_stripped(post.image.name), \
+            'Проверьте, что очищенная копия сохраняется под новым именем'
+        assert post.image.storage.exists(post.image.name)
+        assert not post.image.storage.exists(original), \
+            'Проверьте, что оригинал удаляется после подмены'
+
+        stripped = post.image.name
+        images.process(post.pk)
+        post.refresh_from_db()
+        assert post.image.name == stripped, \
+            'Проверьте, что очищенная картинка не пересохраняется заново'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_image_not_overwritten(self, user, settings, tmp_path,
+                                       monkeypatch):
+        settings.MEDIA_ROOT = str(tmp_path)
+        post = Post.objects.create(text='Фото', author=user,
+                                   image=jpeg_with_exif())
+        original = post.image.name
+        generate = images.generate_variants
+
+        def edited_meanwhile(image_field):
+            # автор загружает новую картинку, пока идёт обработка старой
+            Post.objects.filter(pk=post.pk).update(image='posts/new.png')
+            return generate(image_field)
+
+        monkeypatch.setattr(images, 'generate_variants', edited_meanwhile)
+        images.process(post.pk)
+        post.refresh_from_db()
+        assert post.image.name == 'posts/new.png', \
+            'Проверьте, что устаревшая обработка не затирает новую картинку'
+        assert post.image_variants == ''
+        storage = post.image.storage
+        assert storage.exists(original)
+        assert not storage.listdir('posts/' + images.STRIPPED_DIR)[1], \
+            'Проверьте, что копия устаревшей обработки удаляется'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_process_images_skips_broken(self, user, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        Post.objects.create(
+            text='Битая картинка', author=user,
+            image=SimpleUploadedFile('broken.jpg', b'not an image'))
+        good = Post.objects.create(text='Фото', author=user,
+                                   image=jpeg_with_exif())
+
+        out = io.StringIO()
+        call_command('process_images', stdout=out)
+        assert 'Обработано картинок: 2, ошибок: 1' in out.getvalue(), \
+            'Проверьте, что битый файл не останавливает process_images'
+        good.refresh_from_db()
+        assert 'card' in good.variants
@@ -0,0 +1,48 @@
+import re
+
+import pytest
+
+
+def sample(text, name, **labels):
+    pattern = re.escape(name) + r'\{([^}]*)\} (\S+)'
+    total = 0
+    for found_labels, value in re.findall(pattern, text):
+        if all(f'{key}="{value}"' in found_labels
+               for key, value in labels.items()):
+            total += float(value)
+    return total
+
+
+class TestMetrics:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_metrics_endpoint(self, client, post):
+        before = client.get('/metrics/').content.decode()
+        client.get('/')
+        client.get('/')
+        response = client.get('/metrics/')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        view = 'index'
+        assert sample(text, 'yatube_requests_total', view=view,
+                      status='200') - sample(
+            before, 'yatube_requests_total', view=view, status='200') == 2, \
+            'Проверьте, что считаются запросы к страницам'
+        assert sample(text, 'yatube_request_duration_seconds_count',
+                      view=view) >= 2
+        assert sample(text, 'yatube_db_queries_total', view=view) > 0, \
+            'Проверьте, что считаются SQL-запросы'
+        assert sample(text, 'yatube_template_duration_seconds_sum',
+                      view=view) > 0, \
+            'Проверьте, что меряется время рендеринга шаблонов'
+        assert sample(text, 'yatube_response_size_bytes_sum', view=view) > 0
+        assert sample(text, 'yatube_cache_requests_total', view=view,
+                      kind='card', result='hit') >= 1, \
+            'Проверьте, что учитываются попадания в кеш карточек'
+        assert 'yatube_image_pipeline{stat="queue_depth"}' in text
+
+    def test_metrics_hidden_from_other_hosts(self, client):
+        response = client.get('/metrics/', REMOTE_ADDR='10.0.0.1')
+        assert response.status_code == 404
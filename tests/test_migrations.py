@@ -0,0 +1,34 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+def migrate(target):
+    executor = MigrationExecutor(connection)
+    executor.migrate([target])
+    return executor.loader.project_state(target).apps
+
+
+def latest():
+    return MigrationExecutor(connection).loader.graph.leaf_nodes('posts')[0]
+
+
+class TestMigrations:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_existing_follows_left_undated(self):
+        try:
+            apps = migrate(('posts', '0015_task_queue'))
+            User = apps.get_model('auth', 'User')
+            Follow = apps.get_model('posts', 'Follow')
+            reader = User.objects.create(username='reader')
+            author = User.objects.create(username='author')
+            Follow.objects.create(user=reader, author=author)
+
+            apps = migrate(('posts', '0016_trending'))
+            Follow = apps.get_model('posts', 'Follow')
+            assert Follow.objects.get().created is None, \
+                'Проверьте, что старые подписки не получают дату миграции'
+        finally:
+            # остальные тесты ждут схему последней миграции
+            migrate(latest())
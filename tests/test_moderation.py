@@ -0,0 +1,70 @@
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts import moderation
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment
+
+
+class TestModeration:
+
+    def test_matcher_forms_and_boundaries(self):
+        matcher = moderation.Matcher(['дурак*', 'дура', 'тир'])
+        assert matcher.find('Ты ДУРАКИ все') == 'дурак*', \
+            'Проверьте, что основа со звёздочкой ловит формы слова'
+        assert matcher.find('какая дура!') == 'дура'
+        assert matcher.find('дурацкий трактир, дурашка') is None, \
+            'Проверьте, что слова без звёздочки ищутся только целиком'
+        assert matcher.find('дуууpaк') == 'дурак*', \
+            'Проверьте, что латиница и повторы букв не обходят фильтр'
+        assert list(matcher.finditer('тир и дура')) == ['тир', 'дура']
+
+    def test_terms_inside_words(self):
+        matcher = moderation.Matcher(['абв', 'бвг*', 'в'])
+        assert list(matcher.finditer('абв бвгд в')) == [
+            'абв', 'бвг*', 'в']
+        assert list(matcher.finditer('абвгд')) == [], \
+            'Проверьте, что совпадение внутри слова не засчитывается'
+
+    def test_forms_use_filter(self):
+        post = PostForm({'text': 'Какой же ты дурак'})
+        comment = CommentForm({'text': 'Сам идиот'})
+        assert not post.is_valid() and 'text' in post.errors
+        assert not comment.is_valid() and 'text' in comment.errors, \
+            'Проверьте, что комментарии тоже проходят фильтр'
+        assert CommentForm({'text': 'Хороший пост'}).is_valid()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_view_rejects(self, user_client, post):
+        user_client.post(f'/{post.author.username}/{post.id}/comment/',
+                         {'text': 'КРЕТИНЫ'})
+        assert not Comment.objects.exists()
+
+    def test_hot_reload(self, settings, tmp_path):
+        words = tmp_path / 'words.txt'
+        words.write_text('# словарь\nкапуста\n', encoding='utf-8')
+        settings.MODERATION_WORDS_FILE = str(words)
+        settings.MODERATION_RELOAD_SECONDS = 0
+        assert moderation.check('кислая капуста') == 'капуста'
+        first = moderation.matcher()
+        assert moderation.matcher() is first, \
+            'Проверьте, что неизменный словарь не собирается заново'
+
+        words.write_text('морковь*\n', encoding='utf-8')
+        stat = os.stat(words)
+        os.utime(words, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert moderation.check('кислая капуста') is None, \
+            'Проверьте, что изменённый словарь подхватывается без перезапуска'
+        assert moderation.check('морковью') == 'морковь*'
+
+    def test_bench_moderation(self):
+        out = StringIO()
+        call_command('bench_moderation', terms=200, lengths=[2000],
+                     repeat=1, json=True, stdout=out)
+        result = json.loads(out.getvalue())
+        assert result['terms'] == 200
+        assert result['texts'][0]['automaton_ms'] > 0
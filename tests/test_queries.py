@@ -0,0 +1,42 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Group, Post
+
+
+def count_queries(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+class TestFeedQueries:
+
+    def create_posts(self, count, author, group, commenter):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=author, group=group)
+            Comment.objects.create(post=post, author=commenter, text='!')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_query_count_does_not_depend_on_page_size(self, user_client, user):
+        model = get_user_model()
+        author = model.objects.create_user(username='QueryAuthor')
+        Follow.objects.create(user=user, author=author)
+        group = Group.objects.create(title='Группа', slug='queries')
+        urls = ['/', f'/group/{group.slug}/', f'/{author.username}/',
+                '/follow/']
+
+        self.create_posts(1, author, group, user)
+        small = {url: count_queries(user_client, url) for url in urls}
+
+        self.create_posts(9, author, group, user)
+        for url in urls:
+            assert count_queries(user_client, url) == small[url], \
+                f'Проверьте, что число запросов на странице `{url}` ' \
+                f'не зависит от количества постов на ней'
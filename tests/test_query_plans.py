@@ -0,0 +1,17 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+class TestQueryPlans:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views_use_indexes(self):
+        call_command('seed_data', users=20, groups=3, posts=200, follows=5,
+                     comments=100, stdout=StringIO())
+        out = StringIO()
+
+        # CommandError при полном проходе по таблице или сортировке
+        call_command('check_query_plans', stdout=out)
+        assert 'Все запросы идут по индексам' in out.getvalue()
@@ -0,0 +1,97 @@
+import json
+import time
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from posts import ratelimit
+from posts.models import Comment, Post
+
+from .test_api import basic
+
+
+class TestRateLimit:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_spam_gets_429(self, user_client, user, settings):
+        settings.RATE_LIMITS = {'add_comment': ['user:3/m']}
+        cache.clear()
+        post = Post.objects.create(text='Пост', author=user)
+        url = f'/{user.username}/{post.id}/comment/'
+
+        for number in range(3):
+            response = user_client.post(url, {'text': f'Комментарий {number}'})
+            assert response.status_code == 302
+        response = user_client.post(url, {'text': 'Спам'})
+        assert response.status_code == 429, \
+            'Проверьте, что сверх предела запрос отклоняется с кодом 429'
+        # прошлое окно убывает в течение следующего, поэтому до двух периодов
+        assert 1 <= int(response['Retry-After']) <= 2 * 60, \
+            'Проверьте, что ответ 429 содержит заголовок Retry-After'
+        assert Comment.objects.count() == 3
+        assert user_client.get(url).status_code != 429, \
+            'Проверьте, что ограничение касается только записей'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_429(self, client, user, settings):
+        settings.RATE_LIMITS = {'new_post': ['user:1/h']}
+        cache.clear()
+        auth = basic('TestUser', '1234567')
+        data = json.dumps({'text': 'Пост'})
+        first = client.post('/api/v1/posts/', data,
+                            content_type='application/json', **auth)
+        second = client.post('/api/v1/posts/', data,
+                             content_type='application/json', **auth)
+        assert first.status_code == 201
+        assert second.status_code == 429
+        assert int(second['Retry-After']) == second.json()['retry_after']
+
+    def test_sliding_window(self, settings, monkeypatch):
+        settings.RATE_LIMITS = {'spam': ['ip:10/m']}
+        cache.clear()
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        request.user = AnonymousUser()
+        start = 60 * 1000
+        clock = [start + 30]
+        monkeypatch.setattr(ratelimit.time, 'time', lambda: clock[0])
+
+        for _ in range(10):
+            assert ratelimit.check(request, 'spam') is None
+        assert ratelimit.check(request, 'spam') == 30 + 6, \
+            'Проверьте, что Retry-After учитывает убывание прошлого окна'
+
+        # в середине следующего окна прошлые 10 запросов весят 5
+        clock[0] = start + 90
+        for _ in range(5):
+            assert ratelimit.check(request, 'spam') is None
+        assert ratelimit.check(request, 'spam') == 6
+        other = RequestFactory().post('/', REMOTE_ADDR='10.0.0.2')
+        other.user = AnonymousUser()
+        assert ratelimit.check(other, 'spam') is None, \
+            'Проверьте, что счётчики ведутся отдельно для каждого адреса'
+
+    def test_client_ip_behind_proxy(self, settings):
+        request = RequestFactory().post(
+            '/', REMOTE_ADDR='10.0.0.1',
+            HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7')
+        assert ratelimit.client_ip(request) == '10.0.0.1'
+        settings.RATE_LIMIT_IP_HEADER = 'HTTP_X_FORWARDED_FOR'
+        assert ratelimit.client_ip(request) == '203.0.113.7', \
+            'Проверьте, что адрес берётся из заголовка, выставленного прокси'
+        direct = RequestFactory().post('/', REMOTE_ADDR='10.0.0.2')
+        assert ratelimit.client_ip(direct) == '10.0.0.2', \
+            'Проверьте, что без заголовка адрес берётся из REMOTE_ADDR'
+
+    def test_overhead_under_millisecond(self, settings):
+        cache.clear()
+        settings.RATE_LIMITS = {'spam': ['user:1000000/m', 'ip:1000000/h']}
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.3')
+        request.user = AnonymousUser()
+        count = 2000
+        started = time.perf_counter()
+        for _ in range(count):
+            ratelimit.check(request, 'spam')
+        assert (time.perf_counter() - started) / count < 1e-3, \
+            'Проверьте, что проверка предела дешевле миллисекунды'
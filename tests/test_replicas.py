@@ -0,0 +1,127 @@
+import sqlite3
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from posts.models import Post
+from yatube.routers import COOKIE_NAME, ReplicaMiddleware
+
+
+def run_request(request, write=False):
+    seen = {}
+
+    def view(request):
+        seen['before'] = router.db_for_read(Post)
+        if write:
+            router.db_for_write(Post)
+            seen['after'] = router.db_for_read(Post)
+        return HttpResponse()
+
+    response = ReplicaMiddleware(view)(request)
+    return response, seen
+
+
+class TestReplicaRouter:
+
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        settings.DATABASE_REPLICAS = ['replica1', 'replica2']
+        settings.REPLICA_LAG_SECONDS = 5
+
+    def test_reads_go_to_replicas_in_request(self):
+        response, seen = run_request(RequestFactory().get('/'))
+        assert seen['before'] in ('replica1', 'replica2'), \
+            'Проверьте, что чтение во время запроса идёт на реплику'
+        assert COOKIE_NAME not in response.cookies
+
+    def test_outside_request_uses_primary(self):
+        assert router.db_for_read(Post) == 'default', \
+            'Проверьте, что вне запроса чтение идёт в основную базу'
+
+    def test_read_your_writes(self):
+        factory = RequestFactory()
+        response, seen = run_request(factory.post('/new/'), write=True)
+        assert router.db_for_write(Post) == 'default'
+        assert seen['after'] == 'default', \
+            'Проверьте, что после записи запрос читает основную базу'
+        assert COOKIE_NAME in response.cookies, \
+            'Проверьте, что после записи ставится cookie привязки'
+
+        request = factory.get('/')
+        request.COOKIES[COOKIE_NAME] = response.cookies[COOKIE_NAME].value
+        _, seen = run_request(request)
+        assert seen['before'] == 'default', \
+            'Проверьте, что автор записи какое-то время читает основную базу'
+
+    def test_expired_pin_uses_replicas(self):
+        request = RequestFactory().get('/')
+        request.COOKIES[COOKIE_NAME] = '1'
+        _, seen = run_request(request)
+        assert seen['before'] in ('replica1', 'replica2')
+
+
+@pytest.fixture
+def lagging_replica(settings, tmp_path):
+    """Реплика в отдельном файле; sync() догоняет основную базу."""
+    path = str(tmp_path / 'replica.sqlite3')
+    connections.databases['lagging'] = dict(
+        connections['default'].settings_dict, NAME=path)
+    settings.DATABASE_REPLICAS = ['lagging']
+
+    def sync():
+        connections['lagging'].close()
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.close()
+
+    sync()
+    yield sync
+    connections['lagging'].close()
+    del connections['lagging']
+    del connections.databases['lagging']
+
+
+class TestReplicaCaches:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stale_replica_does_not_fill_caches(self, client, user,
+                                                lagging_replica):
+        cache.clear()
+        old = Post.objects.create(text='Старый текст', author=user)
+        lagging_replica()
+        assert 'Старый текст' in client.get('/').content.decode()
+
+        # запись идёт в основную базу, реплика пока отстаёт
+        Post.objects.create(text='Новый пост', author=user)
+        old.text = 'Правленый текст'
+        old.save()
+        assert Post.objects.using('lagging').get(pk=old.pk).text == \
+            'Старый текст'
+
+        content = client.get('/').content.decode()
+        assert 'Новый пост' in content, \
+            'Проверьте, что список ленты при промахе берётся из основной базы'
+        assert 'Правленый текст' in content, \
+            'Проверьте, что карточка при промахе рисуется по основной базе'
+
+        lagging_replica()
+        content = client.get('/').content.decode()
+        assert 'Новый пост' in content and 'Старый текст' not in content, \
+            'Проверьте, что данные реплики не кешируются под новой версией'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stale_replica_does_not_fill_feeds(self, client, user,
+                                               lagging_replica):
+        cache.clear()
+        Post.objects.create(text='Старый пост', author=user)
+        lagging_replica()
+        Post.objects.create(text='Новый пост', author=user)
+
+        response = client.get('/feeds/index.rss')
+        assert 'Новый пост' in b''.join(
+            response.streaming_content).decode(), \
+            'Проверьте, что лента для кеша читается из основной базы'
@@ -0,0 +1,64 @@
+import pytest
+from django.core.management import call_command
+
+from posts import search
+from posts.models import Post, SearchTerm
+from posts.paginator import PAGE_WINDOW, POSTS_PER_PAGE
+
+
+class TestSearch:
+
+    def test_stem(self):
+        assert search.stem('постами') == search.stem('пост'), \
+            'Проверьте, что стеммер отбрасывает окончания'
+        assert search.analyze('Это красивые посты про котов') == {
+            'красив': 1, 'пост': 1, 'кот': 1}, \
+            'Проверьте, что стоп-слова не попадают в индекс'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_view(self, client, user):
+        Post.objects.create(text='Кот спит на диване', author=user)
+        best = Post.objects.create(
+            text='Коты и кошки: коту нужен диван', author=user)
+        Post.objects.create(text='Собака гуляет', author=user)
+
+        response = client.get('/search/', {'q': 'котов'})
+        assert response.status_code == 200
+        page = response.context['page']
+        assert len(page) == 2, \
+            'Проверьте, что поиск находит посты с разными формами слова'
+        assert page[0] == best, \
+            'Проверьте, что результаты ранжируются по релевантности'
+
+        response = client.get('/search/', {'q': 'кот собака'})
+        assert len(response.context['page']) == 0, \
+            'Проверьте, что ищутся посты со всеми словами запроса'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_page_numbers_windowed(self, client, user):
+        pages = 2 * PAGE_WINDOW + 3
+        for number in range(pages * POSTS_PER_PAGE):
+            Post.objects.create(text=f'Кот номер {number}', author=user)
+
+        response = client.get('/search/', {'q': 'кот', 'page': pages})
+        assert response.context['page'].number == pages
+        assert list(response.context['page_numbers']) == list(
+            range(pages - PAGE_WINDOW, pages + 1)), \
+            'Проверьте, что поиск выводит номера только рядом с текущей'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_updated_on_edit(self, user):
+        post = Post.objects.create(text='Первая версия', author=user)
+        post.text = 'Исправленный текст'
+        post.save()
+        assert not search.search('первая').exists()
+        assert list(search.search('исправленный')) == [post]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_search_index_command(self, user):
+        Post.objects.create(text='Пост для индекса', author=user)
+        SearchTerm.objects.all().delete()
+
+        call_command('rebuild_search_index')
+        assert search.search('индекс').count() == 1, \
+            'Проверьте, что команда заново строит поисковый индекс'
@@ -0,0 +1,101 @@
+import json
+from xml.etree import ElementTree
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Post
+
+
+def body(response):
+    return b''.join(response.streaming_content).decode()
+
+
+class TestSyndication:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_formats(self, client, user, group):
+        Post.objects.create(text='Первый <пост>', author=user, group=group)
+        Post.objects.create(text='Второй пост', author=user)
+
+        response = client.get('/feeds/index.rss')
+        assert response.status_code == 200
+        assert isinstance(response, StreamingHttpResponse), \
+            'Проверьте, что лента отдаётся потоково'
+        assert response['Content-Type'].startswith('application/rss+xml')
+        channel = ElementTree.fromstring(body(response)).find('channel')
+        items = channel.findall('item')
+        assert [item.find('description').text for item in items] == [
+            'Второй пост', 'Первый <пост>']
+
+        response = client.get(f'/feeds/group/{group.slug}.atom')
+        feed = ElementTree.fromstring(body(response))
+        entries = feed.findall('{http://www.w3.org/2005/Atom}entry')
+        assert len(entries) == 1, \
+            'Проверьте, что лента группы содержит только её посты'
+
+        response = client.get(f'/feeds/author/{user.username}.json')
+        data = json.loads(body(response))
+        assert data['version'] == 'https://jsonfeed.org/version/1.1'
+        assert len(data['items']) == 2
+        assert data['items'][0]['authors'] == [{'name': user.username}]
+
+        assert client.get('/feeds/index.txt').status_code == 404
+        assert client.get('/feeds/group/missing.rss').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_conditional_get(self, client, user):
+        Post.objects.create(text='Пост', author=user)
+        response = client.get('/feeds/index.rss')
+        body(response)
+        etag = response['ETag']
+        assert response['Last-Modified']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/feeds/index.rss', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert len(queries) == 0, \
+            'Проверьте, что 304 для главной ленты отдаётся без запросов к базе'
+
+        response = client.get(f'/feeds/author/{user.username}.rss')
+        body(response)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/feeds/author/{user.username}.rss',
+                                  HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304
+        assert len(queries) == 1, \
+            'Проверьте, что 304 для ленты автора стоит одного запроса'
+
+        Post.objects.create(text='Новый пост', author=user)
+        response = client.get('/feeds/index.rss', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что новый пост меняет ETag ленты'
+        assert 'Новый пост' in body(response)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rename_refreshes_feeds(self, client, user, group):
+        Post.objects.create(text='Пост', author=user, group=group)
+        response = client.get('/feeds/index.rss')
+        assert user.username in body(response)
+        etag = response['ETag']
+
+        user.username = 'renamed'
+        user.save()
+        response = client.get('/feeds/index.rss', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что переименование автора меняет ETag ленты'
+        assert '/renamed/' in body(response), \
+            'Проверьте, что лента ведёт на посты по новому имени автора'
+
+        group.title = 'Новое название'
+        group.save()
+        response = client.get('/feeds/author/renamed.rss')
+        assert '<category>Новое название</category>' in body(response), \
+            'Проверьте, что переименование группы обновляет ленты авторов'
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from posts import tasks
+from posts.models import FeedEntry, Post, SearchTerm, Task
+
+calls = []
+
+
+@tasks.task
+def flaky(fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise ValueError('сбой')
+
+
+class TestTasks:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_side_effects_deferred_to_worker(self, user_client, user,
+                                             settings):
+        settings.TASKS_EAGER = False
+        author = get_user_model().objects.create_user(username='Author')
+        Post.objects.create(text='Старый пост', author=author)
+        Task.objects.all().delete()
+
+        user_client.get(f'/{author.username}/follow/')
+        Post.objects.create(text='Новый пост', author=author)
+        assert not FeedEntry.objects.exists(), \
+            'Проверьте, что раскладка по лентам откладывается в очередь'
+        assert Task.objects.filter(status=Task.PENDING).count() == 3
+
+        assert tasks.work(burst=True) == 3
+        assert FeedEntry.objects.filter(user=user).count() == 2, \
+            'Проверьте, что воркер выполняет отложенные задачи'
+        assert SearchTerm.objects.filter(post__text='Новый пост').exists()
+        assert set(Task.objects.values_list('status', flat=True)) == {
+            Task.DONE}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_retry_and_failure(self, settings):
+        settings.TASKS_EAGER = False
+        settings.TASKS_RETRY_DELAY = 0
+        calls.clear()
+        retried = tasks.enqueue(flaky, 1)
+        failed = tasks.enqueue(flaky, 5, max_attempts=2)
+
+        tasks.work(burst=True)
+        retried.refresh_from_db()
+        failed.refresh_from_db()
+        assert retried.status == Task.DONE and retried.attempts == 2, \
+            'Проверьте, что упавшая задача перезапускается'
+        assert failed.status == Task.FAILED and failed.attempts == 2, \
+            'Проверьте, что после max_attempts задача помечается failed'
+        assert 'ValueError' in failed.error
+        assert tasks.stats()['failed'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stale_tasks_requeued(self, settings):
+        settings.TASKS_EAGER = False
+        stale = tasks.enqueue(flaky, 0)
+        Task.objects.filter(pk=stale.pk).update(
+            status=Task.RUNNING,
+            started=timezone.now() - timedelta(hours=1))
+
+        assert tasks.cleanup() == (1, 0)
+        calls.clear()
+        call_command('run_tasks', '--burst')
+        stale.refresh_from_db()
+        assert stale.status == Task.DONE, \
+            'Проверьте, что задачи погибшего воркера возвращаются в очередь'
+
+    @pytest.mark.django_db
+    def test_eager_runs_inline(self):
+        calls.clear()
+        assert tasks.enqueue(flaky, 0) is None
+        assert calls == [0] and not Task.objects.exists()
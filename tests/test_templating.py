@@ -0,0 +1,43 @@
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from posts.models import Post
+from yatube import metrics, templating
+
+
+class TestTemplating:
+
+    def test_warm_compiles_all_templates(self):
+        count, errors = templating.warm()
+        assert count >= 10
+        assert errors == {}, 'Проверьте, что все шаблоны компилируются'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_counts_includes(self, client, user):
+        cache.clear()
+        for number in range(3):
+            Post.objects.create(text=f'Пост {number}', author=user)
+        with templating.profile() as profile:
+            client.get('/')
+        stats = {row[0]: row for row in profile.rows()}
+        assert stats['parts/post.html'][1] == 3, \
+            'Проверьте, что каждая карточка поста учтена отдельно'
+        _, calls, total, own = stats['index.html']
+        assert calls == 1 and 0 <= own <= total
+        assert total >= stats['parts/post.html'][2], \
+            'Проверьте, что полное время включает вложенные шаблоны'
+
+        with templating.profile() as profile:
+            client.get('/')
+        assert 'parts/post.html' not in profile.stats, \
+            'Проверьте, что карточки из кеша не рендерятся заново'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profiling_metrics(self, client, user):
+        Post.objects.create(text='Пост', author=user)
+        with override_settings(TEMPLATE_PROFILING=True):
+            templating.install()
+            client.get('/')
+        assert 'yatube_template_renders_total{template="index.html"}' in \
+            metrics.render()
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Follow, Group, Post, Trending
+from posts.paginator import POSTS_PER_PAGE
+
+
+def comment(post, author, ago=timedelta()):
+    item = Comment.objects.create(post=post, author=author, text='Ответ')
+    Comment.objects.filter(pk=item.pk).update(created=timezone.now() - ago)
+    return item
+
+
+def ranking():
+    return list(trending.trending_posts().values_list('text', flat=True))
+
+
+class TestTrending:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_decayed_ranking(self, user):
+        author = get_user_model().objects.create_user(username='Author')
+        old = Post.objects.create(text='Старый', author=author)
+        fresh = Post.objects.create(text='Свежий', author=author)
+        busy = Post.objects.create(text='Обсуждаемый', author=author)
+        for _ in range(3):
+            comment(old, user, ago=timedelta(days=2))
+        comment(fresh, user)
+        comment(busy, user, ago=timedelta(hours=1))
+        comment(busy, user, ago=timedelta(hours=1))
+
+        assert trending.refresh() == 6
+        assert ranking() == ['Обсуждаемый', 'Свежий', 'Старый'], \
+            'Проверьте, что давняя активность весит меньше свежей'
+
+        # подписка засчитывается последнему посту автора
+        Follow.objects.create(user=user, author=author)
+        assert trending.refresh() == 1
+        assert ranking()[0] == 'Обсуждаемый'
+        assert trending.refresh() == 0, \
+            'Проверьте, что пересчёт учитывает только новые события'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_incremental_matches_rebuild(self, user):
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        posts = [Post.objects.create(text=f'Пост {number}', author=user,
+                                     group=group) for number in range(3)]
+        for number, post in enumerate(posts):
+            comment(post, user, ago=timedelta(hours=number * 5))
+        trending.refresh()
+        comment(posts[2], user)
+        comment(posts[0], user, ago=timedelta(hours=30))
+        trending.refresh()
+        incremental = dict(Trending.objects.values_list('post', 'heat'))
+
+        trending.rebuild()
+        rebuilt = dict(Trending.objects.values_list('post', 'heat'))
+        assert incremental.keys() == rebuilt.keys()
+        for pk, heat in rebuilt.items():
+            assert abs(incremental[pk] - heat) < timedelta(milliseconds=1), \
+                'Проверьте, что пошаговый пересчёт совпадает с полным'
+        assert trending.top_groups() == [group]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cold_posts_pruned(self, user):
+        post = Post.objects.create(text='Пост', author=user)
+        comment(post, user, ago=trending.WINDOW + timedelta(days=1))
+        assert trending.refresh() == 1
+        assert not Trending.objects.exists(), \
+            'Проверьте, что остывшие посты не хранятся в таблице'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_undated_follows_ignored(self, user):
+        author = get_user_model().objects.create_user(username='Author')
+        Post.objects.create(text='Пост', author=author)
+        follow = Follow.objects.create(user=user, author=author)
+        # так выглядят подписки, сделанные до появления даты
+        Follow.objects.filter(pk=follow.pk).update(created=None)
+        assert trending.refresh() == 1
+        assert not Trending.objects.exists(), \
+            'Проверьте, что подписки без даты не попадают в популярное'
+        assert trending.refresh() == 0, \
+            'Проверьте, что подписки без даты не перечитываются заново'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_trending_page(self, client, user):
+        cache.clear()
+        posts = [Post.objects.create(text=f'Пост {number}', author=user)
+                 for number in range(POSTS_PER_PAGE + 2)]
+        for number, post in enumerate(posts):
+            comment(post, user, ago=timedelta(minutes=number))
+        trending.refresh()
+
+        response = client.get('/trending/')
+        assert response.status_code == 200
+        page = response.context['page']
+        assert [post.text for post in page] == [
+            post.text for post in posts[:POSTS_PER_PAGE]], \
+            'Проверьте, что популярное отсортировано по активности'
+        assert response.context['paginator'].count == len(posts)
+        assert 'parts/post.html' in [t.name for t in response.templates], \
+            'Проверьте, что используются те же карточки, что на главной'
+
+        second = client.get('/trending/?page=2').context['page']
+        assert [post.text for post in second] == [
+            post.text for post in posts[POSTS_PER_PAGE:]]
@@ -0,0 +1,234 @@
+"""Кеш в файле SQLite, общий для всех процессов на одной машине.
+
+LocMemCache держит отдельную копию в каждом воркере gunicorn, поэтому
+память и холодные промахи умножаются на число воркеров. Этот бэкенд
+хранит записи в одном файле SQLite в режиме WAL: читатели не блокируют
+писателя, внешний сервер не нужен. Вытеснение — LRU по времени
+последнего обращения с ограничением на число записей и общий размер.
+
+Настройки (OPTIONS):
+    MAX_ENTRIES    — максимум записей (по умолчанию 300, как у Django);
+    MAX_SIZE       — максимум суммарного размера значений в байтах;
+    CULL_FREQUENCY — при переполнении удаляется 1/CULL_FREQUENCY записей;
+    TOUCH_INTERVAL — как часто (в секундах) обновлять время обращения
+                     при чтении, чтобы горячие ключи не писали на каждый get.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+"""
+
+# через сколько записей проверять переполнение
+CULL_CHECK_EVERY = 64
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._max_size = int(options.get("MAX_SIZE", 0)) or None
+        self._touch_interval = float(options.get("TOUCH_INTERVAL", 1))
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _db(self):
+        # отдельное соединение на поток и на процесс (после fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None,
+                check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expiry(self, timeout):
+        # BaseCache уже возвращает абсолютное время истечения
+        return self.get_backend_timeout(timeout)
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _read(self, keys):
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        rows = self._db.execute(
+            f"SELECT key, value, expires, accessed FROM cache "
+            f"WHERE key IN ({placeholders})", keys).fetchall()
+        found, stale, expired = {}, [], []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                expired.append(key)
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > self._touch_interval:
+                stale.append(key)
+        if stale:
+            self._db.executemany(
+                "UPDATE cache SET accessed = ? WHERE key = ?",
+                [(now, key) for key in stale])
+        if expired:
+            self._delete_keys(expired)
+        return found
+
+    def _write(self, rows, mode="REPLACE"):
+        now = time.time()
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            written = 0
+            for key, value, expires in rows:
+                blob = self._dumps(value)
+                if mode == "IGNORE":
+                    db.execute(
+                        "DELETE FROM cache WHERE key = ? AND expires <= ?",
+                        (key, now))
+                cursor = db.execute(
+                    f"INSERT OR {mode} INTO cache "
+                    f"(key, value, expires, accessed, size) "
+                    f"VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, expires, now, len(blob)))
+                written += cursor.rowcount
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self._writes += len(rows)
+        if self._writes >= CULL_CHECK_EVERY:
+            self._writes = 0
+            self._cull()
+        return written
+
+    def _delete_keys(self, keys):
+        placeholders = ",".join("?" * len(keys))
+        cursor = self._db.execute(
+            f"DELETE FROM cache WHERE key IN ({placeholders})", keys)
+        return cursor.rowcount
+
+    def _cull(self):
+        db = self._db
+        db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        count, size = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        over_count = count > self._max_entries
+        over_size = self._max_size is not None and size > self._max_size
+        if not (over_count or over_size):
+            return
+        if self._cull_frequency == 0:
+            db.execute("DELETE FROM cache")
+            return
+        # удаляем наименее давно использованные записи
+        limit = max(count // self._cull_frequency,
+                    count - self._max_entries)
+        if over_size:
+            limit = max(limit, int(count * (1 - self._max_size / size)) + 1)
+        db.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+            "ORDER BY accessed LIMIT ?)", (limit,))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._write(
+            [(key, value, self._expiry(timeout))], mode="IGNORE"))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._read([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        keys = {self._key(key, version): key for key in keys}
+        found = self._read(list(keys))
+        return {keys[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write([(key, value, self._expiry(timeout))])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expiry(timeout)
+        self._write([(self._key(key, version), value, expires)
+                     for key, value in data.items()])
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._db.execute(
+            "UPDATE cache SET expires = ? WHERE key = ? AND "
+            "(expires IS NULL OR expires > ?)",
+            (self._expiry(timeout), key, time.time()))
+        return bool(cursor.rowcount)
+
+    def delete(self, key, version=None):
+        self._delete_keys([self._key(key, version)])
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._delete_keys(keys)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._db.execute(
+            "SELECT 1 FROM cache WHERE key = ? AND "
+            "(expires IS NULL OR expires > ?)", (key, time.time())).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        # BEGIN IMMEDIATE сериализует incr между процессами
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT value, expires FROM cache WHERE key = ?",
+                (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            blob = self._dumps(value)
+            db.execute(
+                "UPDATE cache SET value = ?, size = ?, accessed = ? "
+                "WHERE key = ?", (blob, len(blob), time.time(), key))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return value
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # соединение живёт весь процесс, как и у LocMemCache
+        pass
@@ -0,0 +1,33 @@
+"""Настройка соединений с базой данных.
+
+Каждое новое соединение с SQLite получает PRAGMA из SQLITE_PRAGMAS
+(WAL, synchronous=NORMAL, mmap, размер кеша страниц). Так как с
+CONN_MAX_AGE соединения живут дольше запроса, перед каждым запросом
+проверяется, что они ещё рабочие: оборванное соединение закрывается,
+и Django откроет новое вместо ошибки посреди страницы.
+"""
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,256 @@
+"""Лёгкие метрики запросов в текстовом формате Prometheus.
+
+MetricsMiddleware меряет для каждой страницы время ответа, число и время
+SQL-запросов, время рендеринга шаблонов и размер ответа; posts.caching,
+пагинатор и карточки постов сообщают о попаданиях и промахах кеша через
+record_cache(). Всё складывается в гистограммы и счётчики в памяти
+процесса и отдаётся по адресу /metrics/. На запрос это несколько вызовов
+perf_counter и обновление словарей под одной блокировкой, поэтому
+middleware можно не выключать под нагрузкой.
+
+Данные у каждого процесса свои: Prometheus должен опрашивать воркеры
+по отдельности (или собирать метрики с каждого через sidecar).
+"""
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def inc(self, labels, value=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name, labels, value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels, value):
+        with _lock:
+            self.values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # labels -> [счётчики по корзинам..., сумма, количество]
+        self.values = {}
+
+    def observe(self, labels, value):
+        with _lock:
+            row = self.values.get(labels)
+            if row is None:
+                row = self.values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        for labels, row in sorted(self.values.items()):
+            total = 0
+            for bound, count in zip(self.buckets, row):
+                total += count
+                yield (f"{self.name}_bucket",
+                       labels + (("le", f"{bound:g}"),), total)
+            yield f"{self.name}_bucket", labels + (("le", "+Inf"),), row[-1]
+            yield f"{self.name}_sum", labels, row[-2]
+            yield f"{self.name}_count", labels, row[-1]
+
+
+REQUEST_SECONDS = Histogram(
+    "yatube_request_duration_seconds", "Время ответа страницы",
+    TIME_BUCKETS)
+REQUESTS = Counter("yatube_requests_total", "Запросы по страницам и кодам")
+DB_QUERIES = Counter("yatube_db_queries_total", "SQL-запросы по страницам")
+DB_SECONDS = Histogram(
+    "yatube_db_duration_seconds", "Время SQL-запросов за один ответ",
+    TIME_BUCKETS)
+TEMPLATE_SECONDS = Histogram(
+    "yatube_template_duration_seconds",
+    "Время рендеринга шаблонов за один ответ", TIME_BUCKETS)
+RESPONSE_BYTES = Histogram(
+    "yatube_response_size_bytes", "Размер ответа", SIZE_BUCKETS)
+CACHE = Counter("yatube_cache_requests_total",
+                "Попадания и промахи кеша по видам ключей")
+IMAGES = Gauge("yatube_image_pipeline", "Очередь обработки картинок")
+# воркеры — отдельные процессы, поэтому состояние очереди берётся из базы
+TASKS = Gauge("yatube_task_queue", "Задачи фоновой очереди по статусам")
+# по отдельным шаблонам, только при TEMPLATE_PROFILING (yatube.templating)
+TEMPLATE_RENDERS = Counter("yatube_template_renders_total",
+                           "Число рендерингов шаблона, включая include")
+TEMPLATE_OWN_SECONDS = Counter(
+    "yatube_template_own_seconds_total",
+    "Собственное время рендеринга шаблона без вложенных")
+
+METRICS = [REQUEST_SECONDS, REQUESTS, DB_QUERIES, DB_SECONDS,
+           TEMPLATE_SECONDS, RESPONSE_BYTES, CACHE, IMAGES, TASKS,
+           TEMPLATE_RENDERS, TEMPLATE_OWN_SECONDS]
+
+
+def _current_view():
+    return getattr(_local, "view", None) or "-"
+
+
+def record_cache(kind, hits, misses):
+    """Учитывает попадания и промахи кеша для ключей вида kind."""
+    view = _current_view()
+    if hits:
+        CACHE.inc((("view", view), ("kind", kind), ("result", "hit")), hits)
+    if misses:
+        CACHE.inc(
+            (("view", view), ("kind", kind), ("result", "miss")), misses)
+
+
+class _RequestState:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _local.state = _RequestState()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(state.execute))
+                response = self.get_response(request)
+        finally:
+            _local.state = None
+            _local.view = None
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        labels = (("view", match.view_name if match else "unresolved"),)
+        REQUEST_SECONDS.observe(labels, elapsed)
+        REQUESTS.inc(labels + (("status", str(response.status_code)),))
+        DB_QUERIES.inc(labels, state.queries)
+        DB_SECONDS.observe(labels, state.db_seconds)
+        TEMPLATE_SECONDS.observe(labels, state.template_seconds)
+        if not response.streaming:
+            RESPONSE_BYTES.observe(labels, len(response.content))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # имя нужно record_cache(), который вызывается глубоко из view
+        _local.view = request.resolver_match.view_name
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        state = getattr(_local, "state", None)
+        if state is None:
+            return self.template.render(context, request)
+        # вложенные шаблоны (карточки постов) уже входят во внешний
+        state.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            state.template_depth -= 1
+            if not state.template_depth:
+                state.template_seconds += time.perf_counter() - started
+
+
+class TimedTemplates(DjangoTemplates):
+    """Бэкенд Django-шаблонов, который меряет время рендеринга.
+
+    С TEMPLATE_PROFILING время раскладывается ещё и по шаблонам.
+    """
+
+    def __init__(self, params):
+        super().__init__(params)
+        if settings.TEMPLATE_PROFILING:
+            # yatube.templating сам импортирует этот модуль
+            from yatube import templating
+            templating.install()
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\")
+                         .replace('"', '\\"')) for key, value in labels)
+    return "{" + pairs + "}"
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus."""
+    from posts import images, tasks
+
+    for key, value in images.stats().items():
+        IMAGES.set((("stat", key),), value)
+    for key, value in tasks.stats().items():
+        TASKS.set((("stat", key),), value)
+    lines = []
+    with _lock:
+        for metric in METRICS:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
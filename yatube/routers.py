@@ -0,0 +1,96 @@
+"""Чтение с реплик базы данных, запись в основную базу.
+
+ReplicaRouter отправляет запись в default, а чтение во время запроса — на
+случайную реплику из DATABASE_REPLICAS. Вне запросов (команды, фоновые
+потоки) всё идёт в default: там нельзя угадать, устроит ли отставание
+реплики.
+
+Реплика отстаёт от основной базы, поэтому пользователь, который только
+что что-то записал (новый пост, комментарий, подписка), должен увидеть
+результат. ReplicaMiddleware после запроса с записью ставит cookie на
+REPLICA_LAG_SECONDS, и пока она действует, все чтения этого пользователя
+идут в default. Внутри запроса после первой записи тоже читается default.
+
+Кеши с ключом по версии (posts.caching) заполняются только внутри
+primary(): иначе отстающая реплика записала бы под новую версию старые
+данные, и они жили бы в кеше до следующего изменения.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = "default"
+COOKIE_NAME = "primary_until"
+
+_state = threading.local()
+
+
+def _use_replicas():
+    return getattr(_state, "use_replicas", False)
+
+
+def reading_replicas():
+    """Идёт ли сейчас чтение на реплики."""
+    return _use_replicas() and bool(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def primary():
+    """Чтение внутри блока идёт в основную базу."""
+    previous = _use_replicas()
+    _state.use_replicas = False
+    try:
+        yield
+    finally:
+        # запись внутри блока оставляет запрос на основной базе
+        _state.use_replicas = previous and not getattr(_state, "wrote", False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not reading_replicas():
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, "in_request", False):
+            _state.wrote = True
+            _state.use_replicas = False
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема реплик приезжает вместе с репликацией
+        return db == PRIMARY
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(COOKIE_NAME, 0))
+        except ValueError:
+            pinned_until = 0
+        _state.in_request = True
+        _state.wrote = False
+        _state.use_replicas = pinned_until < time.time()
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.in_request = False
+            _state.use_replicas = False
+        if wrote:
+            until = time.time() + settings.REPLICA_LAG_SECONDS
+            response.set_cookie(
+                COOKIE_NAME, f"{until:.3f}",
+                max_age=settings.REPLICA_LAG_SECONDS, httponly=True)
+        return response
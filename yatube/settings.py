@@ -35,8 +35,9 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
+    'yatube.apps.YatubeConfig',
     'users',
-    'posts',  # наше приложение posts**
+    'posts.apps.PostsConfig',  # наше приложение posts**
     'django.contrib.sites',
     'django.contrib.flatpages',
     'django.contrib.admin',
@@ -50,6 +51,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # первым, чтобы время ответа включало остальные middleware
+    'yatube.metrics.MetricsMiddleware',
+    # до сессий: сохранение сессии тоже запись
+    'yatube.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,14 +69,32 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ] 
 
+# адреса, с которых доступна страница /metrics/ (сборщик Prometheus)
+METRICS_ALLOWED_IPS = [
+    "127.0.0.1",
+]
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# в продакшене шаблоны компилируются один раз на процесс (и прогреваются
+# в wsgi.py), при разработке перечитываются с диска
+TEMPLATE_CACHE = os.environ.get('TEMPLATE_CACHE', str(int(not DEBUG))) == '1'
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# время рендеринга по каждому шаблону и include в /metrics/
+TEMPLATE_PROFILING = os.environ.get('TEMPLATE_PROFILING') == '1'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендеринга для /metrics/
+        'BACKEND': 'yatube.metrics.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -79,6 +102,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
@@ -89,12 +113,59 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Подключение настраивается переменными окружения DB_ENGINE, DB_NAME,
+# DB_USER, DB_PASSWORD, DB_HOST, DB_PORT; по умолчанию — файл SQLite.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': DB_ENGINE,
+        'NAME': os.environ.get(
+            'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+        # соединение переживает запрос и переиспользуется воркером
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
     }
 }
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    # сколько секунд ждать снятия блокировки записи вместо
+    # немедленного "database is locked"
+    DATABASES['default']['OPTIONS'] = {
+        'timeout': int(os.environ.get('DB_TIMEOUT', 20)),
+    }
+
+# Реплики только для чтения (см. yatube.routers). DB_REPLICAS — список
+# через запятую: для SQLite это пути к копиям файла базы, для серверных
+# баз — адреса хостов реплик с теми же именем базы и учётной записью.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+        filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        **({'NAME': replica} if DB_ENGINE == 'django.db.backends.sqlite3'
+           else {'HOST': replica}),
+        # в тестах реплика — та же тестовая база
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+# сколько секунд после записи пользователь читает из основной базы
+REPLICA_LAG_SECONDS = int(os.environ.get('DB_REPLICA_LAG', 5))
+
+# PRAGMA для каждого нового соединения с SQLite (см. yatube.db):
+# WAL не даёт писателю блокировать читателей
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
 
 
 # Password validation
@@ -139,15 +210,46 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
-# Database
-# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+# Фоновая обработка картинок постов (posts.images)
+IMAGE_PIPELINE_WORKERS = 2
+# обрабатывать картинки прямо в запросе (для тестов и отладки)
+IMAGE_PIPELINE_EAGER = False
+
+# Фоновая очередь задач (posts.tasks). С TASKS_EAGER задачи выполняются
+# сразу в запросе; TASKS_EAGER=0 — откладываются до воркеров run_tasks
+TASKS_EAGER = os.environ.get('TASKS_EAGER', '1') == '1'
+TASKS_MAX_ATTEMPTS = 5
+# задержка перед повтором, удваивается с каждой попыткой
+TASKS_RETRY_DELAY = 10
+# задача дольше этого у воркера считается брошенной и уходит в очередь
+TASKS_STALE_SECONDS = 600
+# сколько хранить выполненные задачи
+TASKS_KEEP_SECONDS = 24 * 60 * 60
+
+# Ограничение частоты записей (posts.ratelimit): действие -> правила
+# "область:число/период", область user или ip, период s, m, h или d.
+# Пределы с запасом: их задача — гасить всплески спама, а не мешать людям
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_CACHE = 'default'
+# Действия ниже доступны только после входа, поэтому хватает правил user:
+# правило ip за прокси без RATE_LIMIT_IP_HEADER стало бы общим на весь сайт
+RATE_LIMITS = {
+    'new_post': ['user:10/m', 'user:200/d'],
+    'add_comment': ['user:20/m', 'user:1000/d'],
+    'follow': ['user:60/m'],
 }
+# Заголовок из request.META с адресом клиента, который выставляет свой
+# обратный прокси, например HTTP_X_FORWARDED_FOR или HTTP_X_REAL_IP; из
+# списка берётся последний адрес — его дописал наш прокси. Без настройки
+# адрес — REMOTE_ADDR
+RATE_LIMIT_IP_HEADER = os.environ.get('RATE_LIMIT_IP_HEADER') or None
+
+# Словарь запрещённых слов (posts.moderation) и как часто проверять,
+# не изменился ли файл
+MODERATION_WORDS_FILE = os.environ.get(
+    'MODERATION_WORDS_FILE',
+    os.path.join(BASE_DIR, 'posts', 'banned_words.txt'))
+MODERATION_RELOAD_SECONDS = 5
 
 # Login
 
@@ -163,8 +265,25 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 # Идентификатор текущего сайта
 SITE_ID = 1
 
-CACHES = {
-    'default': {
+# Кеш. LocMemCache отдельный в каждом процессе; при нескольких воркерах
+# gunicorn лучше общий для всех процессов кеш в файле SQLite:
+# CACHE_BACKEND=sqlite
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
-} 
+    },
+    'sqlite': {
+        'BACKEND': 'yatube.cache_backends.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'cache', 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')],
+}
@@ -0,0 +1,124 @@
+"""Прогрев кеша шаблонов и профилирование рендеринга по шаблонам.
+
+warm() компилирует все шаблоны из каталогов движка заранее: с
+кеширующим загрузчиком (TEMPLATE_CACHE) первый запрос воркера уже не
+разбирает шаблоны с диска. Вызывается из wsgi.py при старте воркера.
+
+Профилировщик подменяет django.template.base.Template.render — через
+него проходят и страницы, и {% include %}, и карточки post_cards (_render
+подменять нельзя: его при первом запросе перехватывает debug_toolbar), —
+и для каждого шаблона считает вызовы, полное время и собственное время
+(без вложенных шаблонов). Родитель из {% extends %} рендерится без
+render() и учитывается вместе с наследником. Подмена ставится один раз;
+пока профиль не собирается и TEMPLATE_PROFILING выключен, её цена —
+одна проверка атрибута на шаблон.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.base import Template
+from django.template.utils import get_app_template_dirs
+
+from yatube.metrics import TEMPLATE_OWN_SECONDS, TEMPLATE_RENDERS
+
+_local = threading.local()
+_wrapped = Template.render
+
+
+def template_dirs(engine):
+    """Каталоги шаблонов проекта: DIRS и templates/ своих приложений."""
+    own_apps = [directory for directory in get_app_template_dirs("templates")
+                if directory.startswith(settings.BASE_DIR)]
+    return [*engine.dirs, *own_apps]
+
+
+def template_names(engine):
+    """Имена всех .html-шаблонов проекта."""
+    names = set()
+    for directory in template_dirs(engine):
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(".html"):
+                    path = os.path.join(root, name)
+                    names.add(os.path.relpath(path, directory).replace(
+                        os.sep, "/"))
+    return sorted(names)
+
+
+def warm():
+    """Компилирует все шаблоны; возвращает (число шаблонов, ошибки)."""
+    total, errors = 0, {}
+    for engine in engines.all():
+        names = template_names(engine)
+        total += len(names)
+        for name in names:
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors[name] = str(error)
+    return total, errors
+
+
+class Profile:
+    def __init__(self):
+        # имя шаблона -> [вызовы, полное время, собственное время]
+        self.stats = {}
+
+    def add(self, name, total, own):
+        entry = self.stats.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += total
+        entry[2] += own
+
+    def rows(self):
+        """(имя, вызовы, полное, собственное) по убыванию собственного."""
+        rows = [(name, *values) for name, values in self.stats.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+
+def _profiled_render(self, context):
+    profiles = getattr(_local, "profiles", None)
+    if not profiles and not settings.TEMPLATE_PROFILING:
+        return _wrapped(self, context)
+    stack = _local.__dict__.setdefault("stack", [])
+    # в кадр стека складывается время вложенных шаблонов
+    stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _wrapped(self, context)
+    finally:
+        total = time.perf_counter() - started
+        own = total - stack.pop()
+        if stack:
+            stack[-1] += total
+        name = self.origin.template_name if self.origin else None
+        name = name or "<string>"
+        for profile in profiles or ():
+            profile.add(name, total, own)
+        if settings.TEMPLATE_PROFILING:
+            TEMPLATE_RENDERS.inc((("template", name),))
+            TEMPLATE_OWN_SECONDS.inc((("template", name),), own)
+
+
+def install():
+    global _wrapped
+    if Template.render is not _profiled_render:
+        _wrapped = Template.render
+        Template.render = _profiled_render
+
+
+@contextmanager
+def profile():
+    """Собирает профиль рендеринга шаблонов в текущем потоке."""
+    install()
+    result = Profile()
+    profiles = _local.__dict__.setdefault("profiles", [])
+    profiles.append(result)
+    try:
+        yield result
+    finally:
+        profiles.remove(result)
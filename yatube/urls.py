@@ -20,6 +20,8 @@ from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
 
+from yatube.metrics import metrics_view
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa 
 
@@ -35,6 +37,12 @@ urlpatterns = [
     #  раздел администратора
     path("admin/", admin.site.urls),
 
+    #  JSON API
+    path("api/v1/", include("posts.api_urls")),
+
+    #  метрики для Prometheus
+    path("metrics/", metrics_view, name="metrics"),
+
     path("", include("posts.urls")),
 ]
 
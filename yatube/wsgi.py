@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# шаблоны компилируются до первого запроса, а не во время него
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_CACHE:
+    from yatube import templating  # noqa: E402
+
+    templating.warm()